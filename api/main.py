@@ -15,14 +15,28 @@ Engines:
 Usage:
     uvicorn api.main:app --reload --port 8000
 
+    Or run this module; API_WORKERS and API_LIMIT_CONCURRENCY set the number
+    of worker processes and the maximum number of concurrent connections.
+
 Access at http://localhost:8000
 """
 
+import asyncio
+import codecs
+import hashlib
+import importlib
+import multiprocessing
 import os
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Set
+from typing import TYPE_CHECKING, Optional
 
+import orjson
+from cachetools import LRUCache
 from dotenv import load_dotenv
 from fastapi import FastAPI, File, Query, UploadFile, HTTPException, Header, BackgroundTasks
 
@@ -32,21 +46,14 @@ load_dotenv(Path(__file__).parent.parent / ".env")
 # Get API key from environment
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from config import Config, set_config
-from engines.base import BatchData, Finding
-from engines.engine0_xsd import XSDValidationEngine
-from engines.engine1_schema import SchemaValidationEngine
-from engines.engine2_rules import BusinessRulesEngine
-from engines.engine3_llm import LLMSemanticEngine
-from engines.engine_xpath import XPathBusinessRulesEngine
-from engines.engine_encoding import EncodingValidationEngine
-from engines.engine_final import FinalValidationEngine, SIVICertificationIntegration
+from engines.base import BatchData, Finding, ValidationEngine
 from parser.xml_parser import XMLParser
 from parser.version_manager import detect_xml_version
 from report.json_reporter import JSONReporter
@@ -60,13 +67,38 @@ from chatbot.models.schemas import (
     SuggestRequest,
     SuggestResponse,
 )
-from chatbot.chat.engine import ChatEngine
+
+# Engines and the chat engine pull in heavy dependencies (anthropic,
+# chromadb, sentence-transformers) and are imported on first use
+if TYPE_CHECKING:
+    from chatbot.chat.engine import ChatEngine
+    from engines.engine_final import FinalValidationEngine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown hooks."""
+    # Load the embedding model and knowledge base in the background, so the
+    # first chat question does not wait for them; only done once a
+    # knowledge base exists
+    warmup = None
+    if CHAT_WARMUP and (DATA_DIR / "chroma").exists():
+        warmup = asyncio.create_task(asyncio.to_thread(get_chat_engine().warmup))
+    yield
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+    if _validation_pool is not None:
+        _validation_pool.shutdown(wait=False, cancel_futures=True)
+    if _chat_engine is not None:
+        await _chat_engine.close()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="SIVI AFD Validator",
     description="Web interface for validating SIVI AFD XML files (v2.0 - Gap Analysis Implementation)",
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS for local development
@@ -85,29 +117,85 @@ set_config(config)
 # Frontend directory
 FRONTEND_DIR = Path(__file__).parent.parent / "frontend"
 
+# Directory with the vector store and chat history
+DATA_DIR = Path(__file__).parent.parent / "data"
+
 # Initialize chat engine (lazy loaded)
-_chat_engine: Optional[ChatEngine] = None
+_chat_engine: Optional["ChatEngine"] = None
+
+# Whether to load the chat embedding model and knowledge base at startup
+# instead of on the first question
+CHAT_WARMUP = os.getenv("CHAT_WARMUP", "1") != "0"
+
+# Chunk size used when spooling uploads to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Reports with more findings than this are serialized in a worker thread
+LARGE_REPORT_FINDINGS = 1000
+
+# Number of uvicorn worker processes serving the app; they share the CPUs
+# between their validation pools. Keep at 1 when using the chatbot: a
+# knowledge base rebuild only refreshes the worker that handled it.
+API_WORKERS = max(1, int(os.getenv("API_WORKERS", "1")))
 
+# Maximum number of concurrent connections before new ones get a 503
+API_LIMIT_CONCURRENCY = int(os.getenv("API_LIMIT_CONCURRENCY", "64"))
 
-def get_chat_engine() -> ChatEngine:
+# Worker pool for the CPU-bound validation engines (lazy loaded)
+_validation_pool: Optional[ProcessPoolExecutor] = None
+
+# Order in which engine findings are reported: XSD validation, encoding &
+# data quality (to catch encoding issues early), schema validation,
+# business rules, XPath verbandscontroles
+ENGINE_ORDER = (0, 5, 1, 2, 4)
+
+# CPU-bound validation engines by number, as (module, class name)
+ENGINE_CLASSES: dict[int, tuple[str, str]] = {
+    0: ("engines.engine0_xsd", "XSDValidationEngine"),
+    1: ("engines.engine1_schema", "SchemaValidationEngine"),
+    2: ("engines.engine2_rules", "BusinessRulesEngine"),
+    4: ("engines.engine_xpath", "XPathBusinessRulesEngine"),
+    5: ("engines.engine_encoding", "EncodingValidationEngine"),
+}
+
+# Validation results by (content hash, engines, certify), reused for
+# byte-identical re-uploads
+_validation_cache: LRUCache = LRUCache(maxsize=256)
+
+# Engine instances, built once per worker process (lazy loaded)
+_engines: dict[int, ValidationEngine] = {}
+_final_engine: Optional["FinalValidationEngine"] = None
+
+
+def get_chat_engine() -> "ChatEngine":
     """Get or create the chat engine instance."""
     global _chat_engine
     if _chat_engine is None:
+        from chatbot.chat.engine import ChatEngine
+
         sivi_dir = Path(config.sivi_dir)
-        data_dir = Path(__file__).parent.parent / "data"
         _chat_engine = ChatEngine(
             sivi_dir=sivi_dir,
-            data_dir=data_dir,
+            data_dir=DATA_DIR,
             api_key=ANTHROPIC_API_KEY,
         )
     return _chat_engine
 
 
-def parse_engines(engines_str: Optional[str]) -> Set[int]:
+# Engines run when none are requested: all except LLM (3)
+DEFAULT_ENGINES = frozenset({0, 1, 2, 4, 5})
+
+
+def parse_engines(engines_str: Optional[str]) -> frozenset[int]:
     """Parse engines string like '0,1,2,4,5' into set of integers."""
     if not engines_str:
-        return {0, 1, 2, 4, 5}  # Default: all except LLM (3)
+        return DEFAULT_ENGINES
+    return _parse_engines(engines_str)
 
+
+@lru_cache(maxsize=64)
+def _parse_engines(engines_str: str) -> frozenset[int]:
+    """Parse a non-empty engines string; cached since clients repeat a few."""
     engines = set()
     for part in engines_str.split(","):
         try:
@@ -117,53 +205,164 @@ def parse_engines(engines_str: Optional[str]) -> Set[int]:
         except ValueError:
             pass
 
-    return engines if engines else {0, 1, 2, 4, 5}
+    return frozenset(engines) if engines else DEFAULT_ENGINES
+
+
+def render_json(content) -> bytes:
+    """Serialize a report to JSON bytes with orjson."""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def report_etag(
+    content_hash: bytes,
+    filename: str,
+    engines: frozenset[int],
+    certify: bool,
+) -> str:
+    """
+    Build a weak ETag for the report of an upload.
+
+    Reports differ only in their timestamp for the same content, filename
+    and validation options, so these identify the report.
+    """
+    digest = hashlib.sha256(content_hash + filename.encode()).hexdigest()[:32]
+    engine_ids = "".join(map(str, sorted(engines)))
+    return f'W/"{digest}-{engine_ids}-{int(certify)}"'
+
 
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag."""
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+async def spool_upload(file: UploadFile) -> tuple[Path, bytes]:
+    """
+    Stream an uploaded file to a temporary file in fixed-size chunks.
 
-def validate_batch(
+    The content is checked to be valid UTF-8 and hashed while streaming, so
+    the upload is never held in memory as a whole.
+
+    Returns:
+        Tuple of (temporary file path, SHA-256 digest of the content).
+
+    Raises:
+        UnicodeDecodeError: If the content is not UTF-8 encoded.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    digest = hashlib.sha256()
+    tmp = tempfile.NamedTemporaryFile(suffix=".xml", delete=False)
+    try:
+        with tmp:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                decoder.decode(chunk)
+                digest.update(chunk)
+                tmp.write(chunk)
+            decoder.decode(b"", final=True)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return Path(tmp.name), digest.digest()
+
+
+def get_validation_pool() -> ProcessPoolExecutor:
+    """Get or create the process pool used for CPU-bound validation."""
+    global _validation_pool
+    if _validation_pool is None:
+        cpus_per_worker = max(1, (os.cpu_count() or 1) // API_WORKERS)
+        # Spawn rather than fork: forking a process that runs an event loop
+        # and worker threads can copy held locks into the children
+        _validation_pool = ProcessPoolExecutor(
+            max_workers=cpus_per_worker,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _validation_pool
+
+
+@lru_cache(maxsize=None)
+def get_engine_class(number: int) -> type[ValidationEngine]:
+    """Import the validation engine class with the given number."""
+    module_name, class_name = ENGINE_CLASSES[number]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def get_engine(number: int, cfg: Config) -> ValidationEngine:
+    """
+    Get or create the validation engine with the given number.
+
+    Engines cache their loaded schemas and rule tables, so they are reused
+    across batches instead of being rebuilt for every request.
+    """
+    engine = _engines.get(number)
+    if engine is None:
+        engine = _engines[number] = get_engine_class(number)(cfg)
+    return engine
+
+
+def run_engine(number: int, batch: BatchData, cfg: Config) -> list[Finding]:
+    """
+    Run one CPU-bound validation engine on a batch.
+
+    Runs in a worker process, so it must stay a picklable top-level function
+    and receive its configuration explicitly.
+    """
+    return get_engine(number, cfg).validate(batch)
+
+
+def analyze_semantics(batch: BatchData, api_key: str, cfg: Config) -> list[Finding]:
+    """Run Engine 3 (LLM semantic analysis) on a batch."""
+    from engines.engine3_llm import LLMSemanticEngine
+
+    engine3 = LLMSemanticEngine(cfg, api_key=api_key)
+    return engine3.validate(batch)
+
+
+def certify_batch(batch: BatchData, findings: list[Finding], cfg: Config) -> list[Finding]:
+    """Run the final certification on a batch and the findings so far."""
+    global _final_engine
+    if _final_engine is None:
+        from engines.engine_final import FinalValidationEngine
+
+        _final_engine = FinalValidationEngine(cfg)
+    final_findings, certificate = _final_engine.validate_and_certify(batch, findings)
+    return final_findings
+
+
+async def run_validation(
     batch: BatchData,
-    engines: Set[int],
+    engines: frozenset[int],
     api_key: Optional[str] = None,
     certify: bool = False,
 ) -> list[Finding]:
-    """Run validation engines on a batch."""
-    findings = []
-
-    # Engine 0: XSD validation
-    if 0 in engines:
-        engine0 = XSDValidationEngine(config)
-        findings.extend(engine0.validate(batch))
-
-    # Engine 5: Encoding & data quality (run early to catch encoding issues)
-    if 5 in engines:
-        engine5 = EncodingValidationEngine(config)
-        findings.extend(engine5.validate(batch))
-
-    # Engine 1: Schema validation (includes decimal precision)
-    if 1 in engines:
-        engine1 = SchemaValidationEngine(config)
-        findings.extend(engine1.validate(batch))
+    """
+    Run validation engines on a batch without blocking the event loop.
 
-    # Engine 2: Business rules (extended with branch-coverage, etc.)
-    if 2 in engines:
-        engine2 = BusinessRulesEngine(config)
-        findings.extend(engine2.validate(batch))
+    The CPU-bound engines are independent of each other and run in parallel
+    in the process pool; Engine 3 is network-bound and runs concurrently in
+    the default thread executor. Findings are reported in ENGINE_ORDER.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_validation_pool()
 
-    # Engine 4: XPath verbandscontroles
-    if 4 in engines:
-        engine4 = XPathBusinessRulesEngine(config)
-        findings.extend(engine4.validate(batch))
+    tasks = [
+        loop.run_in_executor(pool, run_engine, number, batch, config)
+        for number in ENGINE_ORDER
+        if number in engines
+    ]
 
     # Engine 3: LLM semantic analysis
     if 3 in engines and api_key:
-        engine3 = LLMSemanticEngine(config, api_key=api_key)
-        findings.extend(engine3.validate(batch))
+        tasks.append(loop.run_in_executor(None, analyze_semantics, batch, api_key, config))
 
-    # Final certification
+    findings = []
+    for engine_findings in await asyncio.gather(*tasks):
+        findings.extend(engine_findings)
+
+    # Final certification (depends on the findings of all other engines)
     if certify and config.enable_final_certification:
-        final_engine = FinalValidationEngine(config)
-        final_findings, certificate = final_engine.validate_and_certify(batch, findings)
-        findings.extend(final_findings)
+        findings.extend(
+            await loop.run_in_executor(pool, certify_batch, batch, findings, config)
+        )
 
     return findings
 
@@ -227,6 +426,8 @@ async def get_config():
 @app.get("/api/sivi-certification")
 async def get_sivi_certification_info():
     """Get information about official SIVI certification."""
+    from engines.engine_final import SIVICertificationIntegration
+
     integration = SIVICertificationIntegration(config)
     return integration.get_certification_info()
 
@@ -240,6 +441,7 @@ async def validate_xml(
     ),
     certify: bool = Query(default=False, description="Enable final certification"),
     x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
+    if_none_match: Optional[str] = Header(default=None),
 ):
     """
     Validate an uploaded XML file.
@@ -254,6 +456,7 @@ async def validate_xml(
         - 5: Encoding & Data Quality (UTF-8, BOM, placeholders)
     - **certify**: Enable final certification check
     - **X-API-Key**: Anthropic API key for Engine 3 (LLM) - optional header
+    - **If-None-Match**: ETag of an earlier report; returns 304 if it still applies
     """
     # Validate file type
     if not file.filename:
@@ -262,10 +465,9 @@ async def validate_xml(
     if not file.filename.lower().endswith(".xml"):
         raise HTTPException(status_code=400, detail="File must be an XML file")
 
-    # Read file content
+    # Stream file content to disk
     try:
-        content = await file.read()
-        xml_string = content.decode("utf-8")
+        upload_path, content_hash = await spool_upload(file)
     except UnicodeDecodeError:
         raise HTTPException(status_code=400, detail="Invalid file encoding. File must be UTF-8 encoded.")
     except Exception as e:
@@ -279,30 +481,55 @@ async def validate_xml(
 
     # Check if LLM engine is requested but no API key provided
     if 3 in engine_set and not api_key:
-        engine_set.discard(3)
-
-    # Parse XML
-    try:
-        parser = XMLParser()
-        batch = parser.parse_string(xml_string)
-        batch.source_file = file.filename
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Error parsing XML: {str(e)}")
+        engine_set = engine_set - {3}
+
+    # Let clients revalidate a report they already have
+    etag = report_etag(content_hash, file.filename, engine_set, certify)
+    if if_none_match and etag_matches(if_none_match, etag):
+        upload_path.unlink(missing_ok=True)
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cache_key = (content_hash, engine_set, certify)
+    cached = _validation_cache.get(cache_key)
+
+    if cached is not None:
+        upload_path.unlink(missing_ok=True)
+        findings, contracts_parsed = cached
+    else:
+        # Parse XML off the event loop
+        try:
+            parser = XMLParser()
+            batch = await asyncio.to_thread(parser.parse_file, upload_path)
+            batch.source_file = file.filename
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error parsing XML: {str(e)}")
+        finally:
+            upload_path.unlink(missing_ok=True)
+
+        # Validate
+        try:
+            findings = await run_validation(batch, engine_set, api_key, certify=certify)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Validation error: {str(e)}")
 
-    # Validate
-    try:
-        findings = validate_batch(batch, engine_set, api_key, certify=certify)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Validation error: {str(e)}")
+        contracts_parsed = len(batch.contracts)
+        _validation_cache[cache_key] = (findings, contracts_parsed)
 
     # Generate JSON report using existing reporter
     reporter = JSONReporter()
     report = reporter._build_report(findings, file.filename, {
-        "engines_requested": list(engine_set),
-        "contracts_parsed": len(batch.contracts),
+        "engines_requested": sorted(engine_set),
+        "contracts_parsed": contracts_parsed,
     })
 
-    return JSONResponse(content=report)
+    # Serialize large reports off the event loop
+    if len(findings) > LARGE_REPORT_FINDINGS:
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(None, render_json, report)
+    else:
+        body = render_json(report)
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 
 # =============================================================================
@@ -322,6 +549,7 @@ async def chat(
     - **conversation_id**: Optional conversation ID for context
     - **finding_context**: Optional validation finding for context
     - **validation_file**: Optional name of the validated file
+    - **want_suggestions**: Whether to generate follow-up suggestions (default true)
     """
     api_key = x_api_key or ANTHROPIC_API_KEY
     if not api_key:
@@ -332,13 +560,49 @@ async def chat(
 
     try:
         engine = get_chat_engine()
-        engine.api_key = api_key
-        response = await engine.chat(request)
+        response = await engine.chat(request, api_key)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
 
+@app.post("/api/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
+):
+    """
+    Send a chat message and stream the response as server-sent events.
+
+    Each piece of the answer is sent as a `data` event holding a JSON string
+    as soon as it is generated, followed by a final `done` event holding the
+    complete chat response.
+
+    - **message**: The user's question
+    - **conversation_id**: Optional conversation ID for context
+    - **finding_context**: Optional validation finding for context
+    - **validation_file**: Optional name of the validated file
+    - **want_suggestions**: Whether to generate follow-up suggestions (default true)
+    """
+    api_key = x_api_key or ANTHROPIC_API_KEY
+    if not api_key:
+        raise HTTPException(
+            status_code=400,
+            detail="API key required for chat functionality. Provide via X-API-Key header or ANTHROPIC_API_KEY env var.",
+        )
+
+    engine = get_chat_engine()
+
+    async def events():
+        async for item in engine.chat_stream(request, api_key):
+            if isinstance(item, ChatResponse):
+                yield f"event: done\ndata: {item.model_dump_json()}\n\n"
+            else:
+                yield f"data: {orjson.dumps(item).decode()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.post("/api/chat/suggest", response_model=SuggestResponse)
 async def suggest_questions(
     request: SuggestRequest,
@@ -358,19 +622,49 @@ async def suggest_questions(
 
     try:
         engine = get_chat_engine()
-        engine.api_key = api_key
-        response = await engine.suggest_questions(request.finding)
+        response = await engine.suggest_questions(request.finding, api_key)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Suggestion error: {str(e)}")
 
 
+@app.post("/api/chat/suggest/stream")
+async def stream_suggestions(
+    request: SuggestRequest,
+    x_api_key: Optional[str] = Header(default=None, alias="X-API-Key"),
+):
+    """
+    Stream suggested questions for a validation finding as server-sent events.
+
+    Each question is sent as a `data` event holding a JSON string as soon as
+    it is complete, followed by a final `done` event.
+
+    - **finding**: The finding to get suggestions for
+    """
+    api_key = x_api_key or ANTHROPIC_API_KEY
+    if not api_key:
+        raise HTTPException(
+            status_code=400,
+            detail="API key required for suggestions.",
+        )
+
+    engine = get_chat_engine()
+
+    async def events():
+        async for question in engine.stream_suggestions(request.finding, api_key):
+            yield f"data: {orjson.dumps(question).decode()}\n\n"
+        yield "event: done\ndata: \n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.get("/api/knowledge/status", response_model=KnowledgeStatus)
 async def knowledge_status():
     """Get the status of the knowledge base."""
     try:
         engine = get_chat_engine()
-        return engine.get_knowledge_status()
+        # Reads the vector store, which blocks
+        return await asyncio.to_thread(engine.get_knowledge_status)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Status error: {str(e)}")
 
@@ -406,4 +700,10 @@ async def rebuild_knowledge(
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        "api.main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=API_WORKERS,
+        limit_concurrency=API_LIMIT_CONCURRENCY,
+    )
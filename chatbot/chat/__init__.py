@@ -5,4 +5,4 @@ Chat engine and context building components.
 # Imports are done lazily to avoid circular dependencies
 # Use: from chatbot.chat.engine import ChatEngine
 
-__all__ = ["ChatEngine", "ContextBuilder", "CHAT_SYSTEM_PROMPT"]
+__all__ = ["ChatEngine", "ContextBuilder", "PromptCache", "SemanticCache", "CHAT_SYSTEM_PROMPT"]
@@ -0,0 +1,86 @@
+"""
+Prompt cache for LLM answers.
+
+Answers are stored under a 128-bit hash of the exact prompt that produced
+them: in memory for the running process and in the chat history database
+so they survive restarts. The prompt itself is never stored.
+"""
+
+import hashlib
+import logging
+from typing import Optional
+
+from cachetools import LRUCache
+
+from ..history import ChatHistory
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of answers kept in memory
+DEFAULT_MAX_ENTRIES = 1024
+
+# Size of the prompt hash in bytes
+HASH_SIZE = 16
+
+
+def prompt_hash(*parts: str) -> bytes:
+    """
+    Hash the parts of a prompt.
+
+    The hashes are stored in the database, so they must not depend on which
+    optional packages are installed.
+
+    Args:
+        parts: Prompt parts, e.g. the system prompt and the user prompt.
+
+    Returns:
+        128-bit BLAKE2b digest of the prompt.
+    """
+    payload = b"\0".join(part.encode() for part in parts)
+    return hashlib.blake2b(payload, digest_size=HASH_SIZE).digest()
+
+
+class PromptCache:
+    """Two-tier (memory and SQLite) cache of answers, keyed by prompt hash."""
+
+    def __init__(self, history: ChatHistory, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the prompt cache.
+
+        Args:
+            history: Chat history whose database stores the cached answers.
+            max_entries: Maximum number of answers kept in memory.
+        """
+        self.history = history
+        self._memory: LRUCache = LRUCache(maxsize=max_entries)
+
+    async def get(self, key: bytes) -> Optional[str]:
+        """
+        Get the cached answer for a prompt.
+
+        Args:
+            key: Prompt hash from prompt_hash().
+
+        Returns:
+            The cached answer, or None on a miss.
+        """
+        answer = self._memory.get(key)
+        if answer is not None:
+            return answer
+
+        answer = await self.history.get_cached_answer(key)
+        if answer is not None:
+            self._memory[key] = answer
+            logger.debug("Prompt cache hit (database)")
+        return answer
+
+    async def set(self, key: bytes, answer: str) -> None:
+        """
+        Cache the answer for a prompt.
+
+        Args:
+            key: Prompt hash from prompt_hash().
+            answer: The answer to cache.
+        """
+        self._memory[key] = answer
+        await self.history.store_cached_answer(key, answer)
@@ -6,11 +6,18 @@ import logging
 from typing import Optional
 
 from ..models.schemas import FindingContext
-from ..vectorstore.retriever import Retriever
+from ..vectorstore.retriever import FINDING_MIN_SCORE, Retriever
 from .prompts import FINDING_CONTEXT_TEMPLATE
 
 logger = logging.getLogger(__name__)
 
+# Number and minimum score of documents retrieved for the question itself
+QUERY_RESULTS = 5
+QUERY_MIN_SCORE = 0.3
+
+# Finding codes about invalid code values, for which valid codes are looked up
+VALID_CODE_FINDINGS = frozenset({"E1-002"})
+
 
 class ContextBuilder:
     """Builds context for chat responses based on retrieved documents and findings."""
@@ -41,27 +48,24 @@ class ContextBuilder:
         Returns:
             Tuple of (context_string, retrieved_documents).
         """
-        # Retrieve relevant documents
+        # Retrieve relevant documents together with query-specific
+        # documents in a single batch
         if finding:
-            documents = self.retriever.retrieve_for_finding(finding)
+            queries, limits = self.retriever.plan_finding_queries(finding)
+            results = self.retriever.retrieve_batch(
+                queries + [(query, None)],
+                limits + [QUERY_RESULTS],
+                min_score=FINDING_MIN_SCORE,
+            )
+            documents = self.retriever.merge_results(results[:-1], n_results=8)
+            query_docs = [d for d in results[-1] if d.get("score", 0) >= QUERY_MIN_SCORE]
         else:
+            # The query-specific results are a subset of these
             documents = self.retriever.retrieve(query, n_results=8)
+            query_docs = []
 
-        # Also search for query-specific documents
-        query_docs = self.retriever.retrieve(query, n_results=5)
-
-        # Merge and deduplicate
-        seen_ids = {d["id"] for d in documents}
-        for doc in query_docs:
-            if doc["id"] not in seen_ids:
-                documents.append(doc)
-                seen_ids.add(doc["id"])
-
-        # Sort by relevance score
-        documents.sort(key=lambda x: x.get("score", 0), reverse=True)
-
-        # Limit to top results
-        documents = documents[:10]
+        # Merge, deduplicate and keep the top results
+        documents = self.retriever.merge_results([documents, query_docs], n_results=10)
 
         # Format context
         context = self.retriever.format_context(documents, max_tokens)
@@ -78,15 +82,7 @@ class ContextBuilder:
         Returns:
             Formatted finding context string.
         """
-        return FINDING_CONTEXT_TEMPLATE.format(
-            code=finding.code or "Onbekend",
-            severity=finding.severity or "Onbekend",
-            entiteit=finding.entiteit or "Onbekend",
-            label=finding.label or "-",
-            waarde=finding.waarde or "-",
-            omschrijving=finding.omschrijving or "-",
-            verwacht=finding.verwacht or "-",
-        )
+        return FINDING_CONTEXT_TEMPLATE.format(*finding.as_ctx_tuple())
 
     def build_suggestion_context(self, finding: FindingContext) -> str:
         """
@@ -132,21 +128,37 @@ class ContextBuilder:
         Returns:
             Dictionary with enriched information.
         """
+        finding_data = finding.model_dump()
+        code = finding_data["code"]
+        entiteit = finding_data["entiteit"]
+
         enriched = {
-            "finding": finding.model_dump(),
+            "finding": finding_data,
             "related_rules": [],
             "valid_codes": [],
             "handbook_refs": [],
         }
 
-        # Search for related expert rules
-        if finding.code:
-            rule_docs = self.retriever.retrieve(
-                f"regel {finding.code}",
-                n_results=3,
-                source_types=["expert"],
-            )
-            for doc in rule_docs:
+        # Collect the searches and embed them in one batch
+        queries = []
+        limits = []
+
+        # Search for related expert rules, if any refer to this code
+        search_rules = bool(code) and code in self.retriever.rule_codes()
+        if search_rules:
+            queries.append((f"regel {code}", ["expert"]))
+            limits.append(3)
+
+        # Search for valid codes if it's a code-related error
+        search_codes = bool(entiteit) and code in VALID_CODE_FINDINGS
+        if search_codes:
+            queries.append((f"geldige codes {entiteit}", ["xsd"]))
+            limits.append(2)
+
+        results = iter(self.retriever.retrieve_batch(queries, limits))
+
+        if search_rules:
+            for doc in next(results):
                 meta = doc.get("metadata", {})
                 if meta.get("rule_id"):
                     enriched["related_rules"].append({
@@ -154,14 +166,8 @@ class ContextBuilder:
                         "title": meta.get("title", ""),
                     })
 
-        # Search for valid codes if it's a code-related error
-        if finding.entiteit and finding.code in ["E1-002"]:
-            code_docs = self.retriever.retrieve(
-                f"geldige codes {finding.entiteit}",
-                n_results=2,
-                source_types=["xsd"],
-            )
-            for doc in code_docs:
+        if search_codes:
+            for doc in next(results):
                 # Extract codes from content
                 content = doc.get("content", "")
                 if "Geldige" in content or "geldig" in content:
@@ -2,10 +2,15 @@
 Chat engine orchestration for the RAG chatbot.
 """
 
+import asyncio
+import itertools
+import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, AsyncIterator, Optional, Union
+
+from cachetools import LRUCache, TTLCache
 
 from ..history import ChatHistory
 from ..models.schemas import (
@@ -17,13 +22,44 @@ from ..models.schemas import (
     Source,
     SuggestResponse,
 )
-from ..vectorstore.retriever import Retriever
-from ..vectorstore.store import VectorStore
-from .context_builder import ContextBuilder
-from .prompts import CHAT_SYSTEM_PROMPT, CHAT_USER_TEMPLATE, SUGGESTION_PROMPT
+from .cache import PromptCache, prompt_hash
+from .prompts import CHAT_SYSTEM_PROMPT, render_chat_user, render_suggestion
+
+if TYPE_CHECKING:
+    from ..ingestion.cache import IngestionCache
+    from ..vectorstore.retriever import Retriever
+    from ..vectorstore.store import VectorStore
+    from .context_builder import ContextBuilder
+    from .semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of a prompt prefix that Anthropic may cache between calls
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# System prompt blocks, built once; the prompt is cached server-side
+CHAT_SYSTEM_BLOCKS = [{"type": "text", "text": CHAT_SYSTEM_PROMPT, "cache_control": CACHE_CONTROL}]
+
+# Timeout in seconds for Anthropic API requests
+HTTP_TIMEOUT = 120.0
+
+# Maximum number of suggested questions per finding
+MAX_SUGGESTIONS = 4
+
+# Follow-up suggestions when the question is not about a finding
+GENERIC_SUGGESTIONS = (
+    "Kun je dit verder toelichten?",
+    "Zijn er nog andere oorzaken mogelijk?",
+    "Hoe voorkom ik dit in de toekomst?",
+)
+
+# Number of API keys an Anthropic client is kept for
+MAX_CLIENTS = 16
+
+# Suggested questions cached per finding (code, severity, entiteit, omschrijving)
+SUGGESTION_CACHE_SIZE = 10_000
+SUGGESTION_CACHE_TTL = 24 * 60 * 60
+
 
 class ChatEngine:
     """Main chat engine orchestrating RAG responses."""
@@ -44,34 +80,55 @@ class ChatEngine:
         """
         self.sivi_dir = sivi_dir
         self.data_dir = data_dir or Path("data")
-        self.api_key = api_key
+        self._api_key = api_key
 
         # Initialize components lazily
-        self._vector_store: Optional[VectorStore] = None
-        self._retriever: Optional[Retriever] = None
-        self._context_builder: Optional[ContextBuilder] = None
+        self._vector_store: Optional["VectorStore"] = None
+        self._retriever: Optional["Retriever"] = None
+        self._context_builder: Optional["ContextBuilder"] = None
         self._history: Optional[ChatHistory] = None
-        self._client = None
+        self._answer_cache: Optional["SemanticCache"] = None
+        self._prompt_cache: Optional[PromptCache] = None
+        self._suggestion_cache: TTLCache = TTLCache(
+            maxsize=SUGGESTION_CACHE_SIZE, ttl=SUGGESTION_CACHE_TTL
+        )
+        # Suggestion requests in flight by (suggestion key, API key), shared
+        # by concurrent identical requests
+        self._pending_suggestions: dict[tuple, asyncio.Future] = {}
+        # Anthropic clients by API key, sharing one connection pool
+        self._clients: LRUCache = LRUCache(maxsize=MAX_CLIENTS)
+        self._http_client = None
+
+    @property
+    def api_key(self) -> Optional[str]:
+        """Get the Anthropic API key."""
+        return self._api_key
 
     @property
-    def vector_store(self) -> VectorStore:
+    def vector_store(self) -> "VectorStore":
         """Get the vector store instance."""
         if self._vector_store is None:
+            from ..vectorstore.store import VectorStore
+
             chroma_dir = self.data_dir / "chroma"
             self._vector_store = VectorStore(persist_directory=chroma_dir)
         return self._vector_store
 
     @property
-    def retriever(self) -> Retriever:
+    def retriever(self) -> "Retriever":
         """Get the retriever instance."""
         if self._retriever is None:
+            from ..vectorstore.retriever import Retriever
+
             self._retriever = Retriever(self.vector_store)
         return self._retriever
 
     @property
-    def context_builder(self) -> ContextBuilder:
+    def context_builder(self) -> "ContextBuilder":
         """Get the context builder instance."""
         if self._context_builder is None:
+            from .context_builder import ContextBuilder
+
             self._context_builder = ContextBuilder(self.retriever)
         return self._context_builder
 
@@ -84,37 +141,257 @@ class ChatEngine:
         return self._history
 
     @property
-    def client(self):
-        """Get the Anthropic client."""
-        if self._client is None:
+    def answer_cache(self) -> "SemanticCache":
+        """Get the semantic cache for chat answers."""
+        if self._answer_cache is None:
+            from .semantic_cache import SemanticCache
+
+            # Embed with the model directly: the cache works on arrays
+            embedding_model = self.vector_store.embedding_function.embedding_model
+            self._answer_cache = SemanticCache(embedding_model.embed_query)
+        return self._answer_cache
+
+    @property
+    def prompt_cache(self) -> PromptCache:
+        """Get the cache of answers by exact prompt."""
+        if self._prompt_cache is None:
+            self._prompt_cache = PromptCache(self.history)
+        return self._prompt_cache
+
+    def get_client(self, api_key: Optional[str] = None):
+        """
+        Get the Anthropic client for an API key.
+
+        Each request passes its own key, so concurrent requests never send
+        their calls with another caller's key.
+
+        Args:
+            api_key: API key of the caller; defaults to the engine's key.
+
+        Returns:
+            AsyncAnthropic client for the key.
+        """
+        api_key = api_key or self._api_key
+        client = self._clients.get(api_key)
+        if client is None:
             import anthropic
-            self._client = anthropic.Anthropic(api_key=self.api_key)
-        return self._client
 
-    async def chat(self, request: ChatRequest) -> ChatResponse:
+            # One connection pool (with the SDK's default limits), shared
+            # by the clients of all keys
+            if self._http_client is None:
+                self._http_client = anthropic.DefaultAsyncHttpxClient(
+                    timeout=anthropic.Timeout(HTTP_TIMEOUT),
+                )
+            client = self._clients[api_key] = anthropic.AsyncAnthropic(
+                api_key=api_key,
+                http_client=self._http_client,
+            )
+        return client
+
+    def warmup(self) -> None:
+        """
+        Load the embedding model and the knowledge base ahead of the first question.
+
+        Failures are only logged: everything is loaded again on first use.
+        """
+        try:
+            self.vector_store.warmup()
+        except Exception as e:
+            logger.warning(f"Could not warm up the knowledge base: {e}")
+
+    async def close(self) -> None:
+        """Release the chat history connection and the HTTP connection pool."""
+        if self._history is not None:
+            await self._history.close()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            self._clients.clear()
+
+    async def chat(self, request: ChatRequest, api_key: Optional[str] = None) -> ChatResponse:
         """
         Process a chat request and return a response.
 
         Args:
             request: The chat request.
+            api_key: Anthropic API key of the caller; defaults to the engine's key.
 
         Returns:
             Chat response with answer and sources.
         """
-        # Get or create conversation
-        if request.conversation_id:
-            conversation_id = request.conversation_id
-        else:
-            conversation_id = await self.history.create_conversation(
-                validation_file=request.validation_file
+        async for item in self.chat_stream(request, api_key):
+            if isinstance(item, ChatResponse):
+                return item
+
+    async def chat_stream(
+        self,
+        request: ChatRequest,
+        api_key: Optional[str] = None,
+    ) -> AsyncIterator[Union[str, ChatResponse]]:
+        """
+        Process a chat request, yielding the answer as it is generated.
+
+        The turn is stored in the history once the answer is complete; an
+        answer cut short by an API error is not stored.
+
+        Args:
+            request: The chat request.
+            api_key: Anthropic API key of the caller; defaults to the engine's key.
+
+        Yields:
+            Pieces of the answer text, followed by the complete chat response.
+        """
+        # Get or create conversation; a new one is stored with its first turn
+        conversation_id = request.conversation_id or self.history.new_conversation_id()
+
+        # Suggestions only depend on the finding, so they are generated
+        # while the answer is being produced
+        suggestions_task = None
+        if request.want_suggestions:
+            suggestions_task = asyncio.create_task(
+                self._generate_suggestions(request.finding_context, api_key)
+            )
+
+        try:
+            query_vector = None
+            cached = None
+            # Only a complete answer is stored in the history and the caches
+            completed = True
+            # Serialized once; scopes the answer cache and is stored in the history
+            finding_json = (
+                request.finding_context.model_dump_json() if request.finding_context else None
+            )
+
+            if request.conversation_id:
+                # Get conversation history while the context is built
+                history_messages, (context, sources) = await asyncio.gather(
+                    self.history.get_conversation_messages(conversation_id, limit=6),
+                    asyncio.to_thread(self._build_context, request),
+                )
+            else:
+                # Without earlier turns the answer only depends on the question
+                # and the finding, so an answer to a similar question can be reused
+                from .semantic_cache import identifier_tokens
+
+                history_messages = []
+                # Questions that only differ in a code ("code 12" and "code 13")
+                # embed almost identically, so their codes and numbers scope the
+                # cache too
+                cache_scope = (finding_json, identifier_tokens(request.message))
+                query_vector = await asyncio.to_thread(self.answer_cache.embed, request.message)
+                cached = self.answer_cache.lookup(query_vector, cache_scope)
+                if cached is None:
+                    context, sources = await asyncio.to_thread(self._build_context, request)
+
+            if cached is not None:
+                answer, sources = cached
+                yield answer
+            else:
+                messages = self._build_messages(request, history_messages, context)
+                key = prompt_hash(CHAT_SYSTEM_PROMPT, json.dumps(messages))
+
+                answer = await self.prompt_cache.get(key)
+                if answer is not None:
+                    yield answer
+                else:
+                    # Stream from Claude API
+                    parts = []
+                    try:
+                        async with self.get_client(api_key).messages.stream(
+                            model="claude-sonnet-4-5-20250929",
+                            max_tokens=2048,
+                            system=CHAT_SYSTEM_BLOCKS,
+                            messages=messages,
+                        ) as stream:
+                            async for text in stream.text_stream:
+                                parts.append(text)
+                                yield text
+                        answer = "".join(parts)
+                        await self.prompt_cache.set(key, answer)
+                    except Exception as e:
+                        logger.error(f"Error calling Claude API: {e}")
+                        completed = False
+                        if parts:
+                            answer = "".join(parts)
+                        else:
+                            answer = f"Sorry, er is een fout opgetreden bij het genereren van het antwoord: {str(e)}"
+                            yield answer
+
+                if completed and query_vector is not None:
+                    self.answer_cache.store(query_vector, (answer, sources), cache_scope)
+
+            # Save messages to history; error messages and partial answers are not
+            if completed:
+                sources_json = None
+                if sources:
+                    sources_json = "[" + ",".join(s.model_dump_json() for s in sources) + "]"
+                await self.history.record_turn(
+                    conversation_id=conversation_id,
+                    user_message=request.message,
+                    assistant_message=answer,
+                    validation_file=request.validation_file,
+                    sources_json=sources_json,
+                    finding_json=finding_json,
+                )
+
+            # Suggested follow-up questions
+            suggestions = await suggestions_task if suggestions_task else []
+
+            # Build response
+            message = ChatMessage(
+                role="assistant",
+                content=answer,
+                sources=sources,
+                timestamp=datetime.now(),
+            )
+
+            yield ChatResponse(
+                conversation_id=conversation_id,
+                message=message,
+                suggested_questions=suggestions,
             )
+        finally:
+            # Don't leave the suggestions running when building the context
+            # fails or the client disconnects
+            if suggestions_task is not None and not suggestions_task.done():
+                suggestions_task.cancel()
+
+    def _build_context(self, request: ChatRequest) -> tuple[str, list[Source]]:
+        """
+        Retrieve the context for a chat request.
+
+        Runs in a worker thread: retrieval embeds the question and queries
+        the vector store, which would otherwise block the event loop.
+
+        Args:
+            request: The chat request.
 
-        # Build context
+        Returns:
+            Tuple of (context string, sources for the response).
+        """
         context, documents = self.context_builder.build_context(
-            query=request.message,
-            finding=request.finding_context,
+            request.message,
+            request.finding_context,
         )
+        return context, self.retriever.build_sources(documents)
+
+    def _build_messages(
+        self,
+        request: ChatRequest,
+        history_messages: list[dict],
+        context: str,
+    ) -> list[dict]:
+        """
+        Build the Claude messages for a chat request.
+
+        Args:
+            request: The chat request.
+            history_messages: Earlier messages of the conversation.
+            context: Context string from the retrieved documents.
 
+        Returns:
+            Messages for the Claude API.
+        """
         # Format finding context if present
         finding_text = ""
         if request.finding_context:
@@ -123,17 +400,12 @@ class ChatEngine:
             )
 
         # Build user prompt
-        user_prompt = CHAT_USER_TEMPLATE.format(
+        user_prompt = render_chat_user(
             context=context,
             finding_context=finding_text,
             question=request.message,
         )
 
-        # Get conversation history for context
-        history_messages = await self.history.get_conversation_messages(
-            conversation_id, limit=6
-        )
-
         # Build messages for Claude
         messages = []
         for msg in history_messages:
@@ -142,123 +414,179 @@ class ChatEngine:
                 "content": msg["content"],
             })
 
+        # Cache the prefix up to the last history message; the next turn
+        # repeats it and moves the breakpoint forward
+        if messages:
+            messages[-1]["content"] = [{
+                "type": "text",
+                "text": messages[-1]["content"],
+                "cache_control": CACHE_CONTROL,
+            }]
+
         # Add current user message
         messages.append({
             "role": "user",
             "content": user_prompt,
         })
 
-        # Call Claude API
-        try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=2048,
-                system=CHAT_SYSTEM_PROMPT,
-                messages=messages,
-            )
-            answer = response.content[0].text
-        except Exception as e:
-            logger.error(f"Error calling Claude API: {e}")
-            answer = f"Sorry, er is een fout opgetreden bij het genereren van het antwoord: {str(e)}"
-
-        # Build source list
-        sources = self.retriever.build_sources(documents)
-
-        # Save messages to history
-        finding_dict = request.finding_context.model_dump() if request.finding_context else None
-        await self.history.add_message(
-            conversation_id=conversation_id,
-            role="user",
-            content=request.message,
-            finding_context=finding_dict,
-        )
-
-        source_dicts = [s.model_dump() for s in sources]
-        await self.history.add_message(
-            conversation_id=conversation_id,
-            role="assistant",
-            content=answer,
-            sources=source_dicts,
-        )
-
-        # Generate suggested follow-up questions
-        suggestions = await self._generate_suggestions(
-            question=request.message,
-            answer=answer,
-            finding=request.finding_context,
-        )
-
-        # Build response
-        message = ChatMessage(
-            role="assistant",
-            content=answer,
-            sources=sources,
-            timestamp=datetime.now(),
-        )
+        return messages
 
-        return ChatResponse(
-            conversation_id=conversation_id,
-            message=message,
-            suggested_questions=suggestions,
-        )
-
-    async def suggest_questions(self, finding: FindingContext) -> SuggestResponse:
+    async def suggest_questions(
+        self,
+        finding: FindingContext,
+        api_key: Optional[str] = None,
+    ) -> SuggestResponse:
         """
         Generate suggested questions for a finding.
 
         Args:
             finding: The finding to generate suggestions for.
+            api_key: Anthropic API key of the caller; defaults to the engine's key.
 
         Returns:
             List of suggested questions.
         """
-        prompt = SUGGESTION_PROMPT.format(
-            code=finding.code or "Onbekend",
-            severity=finding.severity or "Onbekend",
-            entiteit=finding.entiteit or "Onbekend",
-            omschrijving=finding.omschrijving or "Geen omschrijving",
-        )
+        key = self._suggestion_key(finding)
+        questions = self._suggestion_cache.get(key)
+        if questions is not None:
+            return SuggestResponse(questions=list(questions))
+
+        # Only requests with the same key share a call, so each caller's
+        # request is sent with its own key
+        pending_key = (key, api_key or self._api_key)
+        pending = self._pending_suggestions.get(pending_key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._request_suggestions(finding, key, api_key))
+            self._pending_suggestions[pending_key] = pending
+            pending.add_done_callback(
+                lambda _: self._pending_suggestions.pop(pending_key, None)
+            )
+
+        # Shielded, so one cancelled request does not cancel the others
+        questions = await asyncio.shield(pending)
+        return SuggestResponse(questions=list(questions))
+
+    async def _request_suggestions(
+        self,
+        finding: FindingContext,
+        key: tuple,
+        api_key: Optional[str] = None,
+    ) -> list[str]:
+        """Get suggested questions from Claude and cache them under key."""
+        prompt = self._suggestion_prompt(finding)
+        hash_key = prompt_hash(prompt)
 
         try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=500,
-                messages=[{"role": "user", "content": prompt}],
-            )
-            text = response.content[0].text
+            text = await self.prompt_cache.get(hash_key)
+            if text is None:
+                response = await self.get_client(api_key).messages.create(
+                    model="claude-sonnet-4-5-20250929",
+                    max_tokens=500,
+                    messages=[{"role": "user", "content": prompt}],
+                )
+                text = response.content[0].text
+                await self.prompt_cache.set(hash_key, text)
 
             # Parse questions (one per line)
             questions = [q.strip() for q in text.split("\n") if q.strip()]
-            questions = questions[:4]  # Limit to 4
+            questions = questions[:MAX_SUGGESTIONS]
+            self._suggestion_cache[key] = tuple(questions)
+
+        except Exception as e:
+            logger.error(f"Error generating suggestions: {e}")
+            questions = self._fallback_suggestions(finding)
+
+        return questions
+
+    async def stream_suggestions(
+        self,
+        finding: FindingContext,
+        api_key: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Generate suggested questions for a finding, yielding each as soon as
+        the model has finished writing it.
+
+        Args:
+            finding: The finding to generate suggestions for.
+            api_key: Anthropic API key of the caller; defaults to the engine's key.
+
+        Yields:
+            Suggested questions.
+        """
+        key = self._suggestion_key(finding)
+        questions = self._suggestion_cache.get(key)
+        if questions is not None:
+            for question in questions:
+                yield question
+            return
+
+        questions = []
+        try:
+            async with self.get_client(api_key).messages.stream(
+                model="claude-sonnet-4-5-20250929",
+                max_tokens=500,
+                messages=[{"role": "user", "content": self._suggestion_prompt(finding)}],
+            ) as stream:
+                pending = ""
+                async for text in stream.text_stream:
+                    pending += text
+                    # Questions are one per line; keep the unfinished last line
+                    *lines, pending = pending.split("\n")
+                    for line in lines:
+                        if line.strip() and len(questions) < MAX_SUGGESTIONS:
+                            questions.append(line.strip())
+                            yield line.strip()
+
+                    if len(questions) == MAX_SUGGESTIONS:
+                        break
+
+                if pending.strip() and len(questions) < MAX_SUGGESTIONS:
+                    questions.append(pending.strip())
+                    yield pending.strip()
+
+            self._suggestion_cache[key] = tuple(questions)
 
         except Exception as e:
             logger.error(f"Error generating suggestions: {e}")
-            # Fallback suggestions
-            questions = [
-                f"Waarom krijg ik deze {finding.code} fout?",
-                f"Hoe los ik deze bevinding op?",
-                f"Welke waarden zijn geldig voor {finding.entiteit}?",
-            ]
+            if not questions:
+                for question in self._fallback_suggestions(finding):
+                    yield question
+
+    @staticmethod
+    def _suggestion_key(finding: FindingContext) -> tuple:
+        """Key for the suggestion cache; the fields the suggestion prompt uses."""
+        return (finding.code, finding.severity, finding.entiteit, finding.omschrijving)
+
+    def _suggestion_prompt(self, finding: FindingContext) -> str:
+        """Build the prompt for generating suggested questions."""
+        return render_suggestion(
+            code=finding.code or "Onbekend",
+            severity=finding.severity or "Onbekend",
+            entiteit=finding.entiteit or "Onbekend",
+            omschrijving=finding.omschrijving or "Geen omschrijving",
+        )
 
-        return SuggestResponse(questions=questions)
+    def _fallback_suggestions(self, finding: FindingContext) -> list[str]:
+        """Suggestions used when the LLM cannot be reached."""
+        return [
+            f"Waarom krijg ik deze {finding.code} fout?",
+            "Hoe los ik deze bevinding op?",
+            f"Welke waarden zijn geldig voor {finding.entiteit}?",
+        ]
 
     async def _generate_suggestions(
         self,
-        question: str,
-        answer: str,
         finding: Optional[FindingContext] = None,
+        api_key: Optional[str] = None,
     ) -> list[str]:
         """Generate follow-up question suggestions."""
         if finding:
-            response = await self.suggest_questions(finding)
+            response = await self.suggest_questions(finding, api_key)
             return response.questions[:3]
 
-        # Generic follow-ups based on answer
-        return [
-            "Kun je dit verder toelichten?",
-            "Zijn er nog andere oorzaken mogelijk?",
-            "Hoe voorkom ik dit in de toekomst?",
-        ]
+        # Generic follow-ups
+        return list(GENERIC_SUGGESTIONS)
 
     async def rebuild_knowledge_base(self) -> dict:
         """
@@ -267,17 +595,16 @@ class ChatEngine:
         Returns:
             Statistics about the rebuild.
         """
-        from ..ingestion import (
-            CodelistProcessor,
-            ExpertProcessor,
-            PDFProcessor,
-            XSDProcessor,
-        )
+        from ..ingestion.cache import IngestionCache
+        from ..ingestion.codelist_processor import CodelistProcessor
+        from ..ingestion.xsd_processor import XSDProcessor
 
         logger.info("Starting knowledge base rebuild...")
 
         # Clear existing data
-        self.vector_store.delete_all()
+        await asyncio.to_thread(self.vector_store.delete_all)
+        self.retriever.invalidate()
+        self.answer_cache.clear()
 
         stats = {
             "pdf": 0,
@@ -287,59 +614,63 @@ class ChatEngine:
             "total": 0,
         }
 
-        # Process XSD files
-        logger.info("Processing XSD files...")
-        xsd_processor = XSDProcessor(self.sivi_dir)
-        xsd_docs = xsd_processor.process_all()
-        if xsd_docs:
-            self.vector_store.add_documents(xsd_docs)
-            stats["xsd"] = len(xsd_docs)
-
-        # Process codelist JSON files
-        logger.info("Processing codelist files...")
-        codelist_processor = CodelistProcessor(self.sivi_dir)
-        codelist_docs = codelist_processor.process_all()
-        if codelist_docs:
-            self.vector_store.add_documents(codelist_docs)
-            stats["codelist"] = len(codelist_docs)
-
-        # Process expert knowledge
-        logger.info("Processing expert knowledge...")
-        knowledge_dir = self.sivi_dir.parent / "sivi-validator" / "knowledge"
-        if knowledge_dir.exists():
-            expert_processor = ExpertProcessor(knowledge_dir)
-            expert_docs = expert_processor.process_all()
-            if expert_docs:
-                self.vector_store.add_documents(expert_docs)
-                stats["expert"] = len(expert_docs)
-
-        # Process PDF documents (if any in data directory)
-        logger.info("Processing PDF documents...")
-        pdf_dir = self.data_dir / "pdfs"
-        if pdf_dir.exists():
-            pdf_processor = PDFProcessor()
-            pdf_docs = pdf_processor.process_directory(pdf_dir)
-            if pdf_docs:
-                self.vector_store.add_documents(pdf_docs)
-                stats["pdf"] = len(pdf_docs)
+        # Documents from unchanged codelist and PDF files are reused
+        cache = IngestionCache(self.data_dir / "ingestion_cache")
 
-        # Also check sivi directory for PDFs
-        sivi_pdf_docs = []
-        for pdf_path in self.sivi_dir.glob("*.pdf"):
-            pdf_processor = PDFProcessor()
-            pdf_docs = pdf_processor.process(pdf_path)
-            sivi_pdf_docs.extend(pdf_docs)
+        # The processors read separate directories, so they run concurrently
+        logger.info("Processing XSD, codelist, expert and PDF sources...")
+        xsd_docs, codelist_docs, expert_docs, pdf_docs = await asyncio.gather(
+            asyncio.to_thread(XSDProcessor(self.sivi_dir).process_all),
+            asyncio.to_thread(CodelistProcessor(self.sivi_dir, cache).process_all),
+            asyncio.to_thread(self._process_expert_knowledge),
+            asyncio.to_thread(self._process_pdfs, cache),
+        )
 
-        if sivi_pdf_docs:
-            self.vector_store.add_documents(sivi_pdf_docs)
-            stats["pdf"] += len(sivi_pdf_docs)
+        stats["xsd"] = len(xsd_docs)
+        stats["codelist"] = len(codelist_docs)
+        stats["expert"] = len(expert_docs)
+        stats["pdf"] = len(pdf_docs)
 
-        stats["total"] = sum(stats.values()) - stats["total"]
+        # Add everything in one pass so each batch is full-sized
+        documents = itertools.chain(xsd_docs, codelist_docs, expert_docs, pdf_docs)
+        await asyncio.to_thread(self.vector_store.add_documents, documents)
+
+        stats["total"] = stats["pdf"] + stats["xsd"] + stats["codelist"] + stats["expert"]
         self.vector_store.set_rebuild_timestamp()
 
+        # Drop anything cached from the partially rebuilt store
+        self.retriever.invalidate()
+        self.answer_cache.clear()
+
         logger.info(f"Knowledge base rebuild complete: {stats}")
         return stats
 
+    def _process_expert_knowledge(self) -> list[dict]:
+        """Process the expert knowledge next to the SIVI directory, if present."""
+        from ..ingestion.expert_processor import ExpertProcessor
+
+        knowledge_dir = self.sivi_dir.parent / "sivi-validator" / "knowledge"
+        if not knowledge_dir.exists():
+            return []
+        return ExpertProcessor(knowledge_dir).process_all()
+
+    def _process_pdfs(self, cache: Optional["IngestionCache"] = None) -> list[dict]:
+        """Process PDF documents from the data and SIVI directories."""
+        from ..ingestion.pdf_processor import PDFProcessor
+
+        pdf_processor = PDFProcessor(cache=cache)
+        docs = []
+
+        # PDF documents in data directory (if any)
+        pdf_dir = self.data_dir / "pdfs"
+        if pdf_dir.exists():
+            docs.extend(pdf_processor.process_directory(pdf_dir))
+
+        # Also check sivi directory for PDFs
+        docs.extend(pdf_processor.process_files(list(self.sivi_dir.glob("*.pdf"))))
+
+        return docs
+
     def get_knowledge_status(self) -> KnowledgeStatus:
         """
         Get the current status of the knowledge base.
@@ -2,6 +2,27 @@
 System prompts for the RAG chatbot.
 """
 
+from string import Formatter
+
+
+def _template_parts(template: str, fields: tuple[str, ...]) -> tuple[str, ...]:
+    """
+    Split a format template into the literal text around its fields.
+
+    Args:
+        template: Template with named fields.
+        fields: Expected field names, in order of appearance.
+
+    Returns:
+        Literal parts; one more than there are fields.
+    """
+    parsed = list(Formatter().parse(template))
+    if tuple(name for _, name, _, _ in parsed if name is not None) != fields:
+        raise ValueError(f"Template fields do not match {fields}")
+    parts = tuple(literal for literal, _, _, _ in parsed)
+    # A template ending in a field has no trailing literal
+    return parts if parsed[-1][1] is None else parts + ("",)
+
 CHAT_SYSTEM_PROMPT = """Je bent een expert assistent voor de SIVI AFD XML Validator.
 Je helpt gebruikers met vragen over:
 - Validatie-bevindingen en hoe deze op te lossen
@@ -37,15 +58,27 @@ Gebruikersvraag: {question}
 
 Beantwoord de vraag op basis van de context. Als je het antwoord niet weet, zeg dit eerlijk."""
 
+# CHAT_USER_TEMPLATE split once, so rendering is a single join
+_CHAT_USER_PARTS = _template_parts(
+    CHAT_USER_TEMPLATE, ("context", "finding_context", "question")
+)
+
+
+def render_chat_user(context: str, finding_context: str, question: str) -> str:
+    """Render CHAT_USER_TEMPLATE."""
+    p = _CHAT_USER_PARTS
+    return "".join((p[0], context, p[1], finding_context, p[2], question, p[3]))
+
 
+# Positional fields, in the order of FindingContext.as_ctx_tuple()
 FINDING_CONTEXT_TEMPLATE = """De vraag gaat over deze specifieke validatie-bevinding:
-- Code: {code}
-- Ernst: {severity}
-- Entiteit: {entiteit}
-- Veld: {label}
-- Waarde: {waarde}
-- Omschrijving: {omschrijving}
-- Verwacht: {verwacht}
+- Code: {0}
+- Ernst: {1}
+- Entiteit: {2}
+- Veld: {3}
+- Waarde: {4}
+- Omschrijving: {5}
+- Verwacht: {6}
 """
 
 
@@ -66,6 +99,17 @@ Genereer vragen in het Nederlands. Focus op:
 
 Antwoord ALLEEN met de vragen, één per regel, zonder nummering of bullets."""
 
+# SUGGESTION_PROMPT split once, so rendering is a single join
+_SUGGESTION_PARTS = _template_parts(
+    SUGGESTION_PROMPT, ("code", "severity", "entiteit", "omschrijving")
+)
+
+
+def render_suggestion(code: str, severity: str, entiteit: str, omschrijving: str) -> str:
+    """Render SUGGESTION_PROMPT."""
+    p = _SUGGESTION_PARTS
+    return "".join((p[0], code, p[1], severity, p[2], entiteit, p[3], omschrijving, p[4]))
+
 
 SUMMARY_PROMPT = """Vat het volgende antwoord samen in maximaal 2 zinnen.
 Behoud de belangrijkste informatie en eventuele bronvermeldingen.
@@ -0,0 +1,149 @@
+"""
+Semantic cache for chat answers.
+
+Answers are stored under the embedding of the question that produced them,
+so a paraphrase of an earlier question can be answered without calling the
+LLM again.
+"""
+
+import logging
+import re
+from typing import Any, Callable, Hashable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Minimum cosine similarity for two questions to count as the same
+DEFAULT_THRESHOLD = 0.92
+
+# Maximum number of cached answers
+DEFAULT_MAX_ENTRIES = 1024
+
+# Codes and numbers (E1-002, 3002, AN); embeddings barely tell them apart
+IDENTIFIER_PATTERN = re.compile(r"[\w-]*\d[\w-]*|\b[A-Z]{2,}\b")
+
+
+def identifier_tokens(text: str) -> frozenset[str]:
+    """
+    Extract the codes and numbers from a text.
+
+    Two texts that only differ in a code ("code 12" and "code 13") embed
+    almost identically, so callers add these tokens to the cache scope.
+
+    Args:
+        text: Question or query text.
+
+    Returns:
+        Set of code and number tokens, upper-cased.
+    """
+    return frozenset(token.upper() for token in IDENTIFIER_PATTERN.findall(text))
+
+
+class SemanticCache:
+    """In-memory cache of answers, looked up by question similarity."""
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Any],
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            embed_fn: Function returning the embedding vector for a text.
+            threshold: Minimum cosine similarity for a cache hit.
+            max_entries: Maximum number of entries; the oldest are replaced first.
+        """
+        self._embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        # Normalized embeddings, one row per entry (allocated on first store)
+        self._vectors: Optional[np.ndarray] = None
+        self._scopes: list[Hashable] = []
+        self._values: list[Any] = []
+        self._next = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a question for lookup and storage.
+
+        Args:
+            text: Question text.
+
+        Returns:
+            Normalized embedding vector.
+        """
+        return self.normalize(self._embed_fn(text))
+
+    @staticmethod
+    def normalize(vector: Any) -> np.ndarray:
+        """
+        Normalize an embedding computed elsewhere for lookup and storage.
+
+        Args:
+            vector: Embedding vector.
+
+        Returns:
+            Normalized embedding vector.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector: np.ndarray, scope: Hashable = None) -> Optional[Any]:
+        """
+        Find the cached answer for the most similar question.
+
+        Args:
+            vector: Normalized question embedding from embed().
+            scope: Only entries stored with an equal scope can match.
+
+        Returns:
+            The cached value, or None if no question is similar enough.
+        """
+        if not self._values:
+            return None
+
+        similarities = self._vectors[: len(self._values)] @ vector
+        candidates = np.flatnonzero(similarities >= self.threshold)
+
+        for index in candidates[np.argsort(-similarities[candidates])]:
+            if self._scopes[index] == scope:
+                logger.debug(f"Semantic cache hit (similarity {similarities[index]:.3f})")
+                return self._values[index]
+
+        return None
+
+    def store(self, vector: np.ndarray, value: Any, scope: Hashable = None) -> None:
+        """
+        Store an answer under a question embedding.
+
+        Args:
+            vector: Normalized question embedding from embed().
+            value: Value to cache.
+            scope: Scope the entry belongs to.
+        """
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+        index = self._next
+        self._vectors[index] = vector
+        if index < len(self._values):
+            self._scopes[index] = scope
+            self._values[index] = value
+        else:
+            self._scopes.append(scope)
+            self._values.append(value)
+
+        self._next = (index + 1) % self.max_entries
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._vectors = None
+        self._scopes.clear()
+        self._values.clear()
+        self._next = 0
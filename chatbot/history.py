@@ -2,12 +2,15 @@
 Chat history database using SQLite.
 """
 
+import asyncio
 import json
 import logging
-import uuid
+import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 import aiosqlite
 
@@ -16,6 +19,30 @@ logger = logging.getLogger(__name__)
 # Default database path
 DEFAULT_DB_PATH = Path("data/chat_history.db")
 
+# Cached answers older than this are dropped; the knowledge base they were
+# generated from may have changed since
+ANSWER_CACHE_MAX_AGE = "-30 days"
+
+# Maximum number of cached answers; the oldest are dropped first
+ANSWER_CACHE_MAX_ENTRIES = 10_000
+
+# Number of stored answers between two prunes of the answer cache
+ANSWER_CACHE_PRUNE_INTERVAL = 100
+
+# Crockford base32 alphabet used by ULIDs
+ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+# Connection settings: WAL lets readers run during a write and makes commits
+# cheap appends; synchronous=NORMAL is durable across crashes in WAL mode
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA cache_size=-65536",  # 64 MB
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+)
+
 
 class ChatHistory:
     """Async SQLite database for storing chat conversations."""
@@ -28,52 +55,133 @@ class ChatHistory:
             db_path: Path to the SQLite database file.
         """
         self.db_path = db_path or DEFAULT_DB_PATH
-        self._initialized = False
+        self._db: Optional[aiosqlite.Connection] = None
+        self._init_lock = asyncio.Lock()
+        # Serializes write transactions on the shared connection
+        self._write_lock = asyncio.Lock()
+        # Answers stored since the answer cache was last pruned
+        self._answers_since_prune = 0
 
     async def initialize(self) -> None:
-        """Initialize the database schema."""
-        if self._initialized:
+        """Open the database connection and initialize the schema."""
+        if self._db is not None:
             return
 
-        # Ensure directory exists
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
-
-        async with aiosqlite.connect(str(self.db_path)) as db:
-            # Create conversations table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id TEXT PRIMARY KEY,
-                    validation_file TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Create messages table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    conversation_id TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    sources JSON,
-                    finding_context JSON,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
-                )
-            """)
-
-            # Create indexes
-            await db.execute("""
-                CREATE INDEX IF NOT EXISTS idx_messages_conversation
-                ON messages(conversation_id)
-            """)
-
-            await db.commit()
-
-        self._initialized = True
+        async with self._init_lock:
+            if self._db is not None:
+                return
+
+            # Ensure directory exists
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+            db = await aiosqlite.connect(str(self.db_path))
+            db.row_factory = aiosqlite.Row
+            for pragma in CONNECTION_PRAGMAS:
+                await db.execute(pragma)
+            await self._create_schema(db)
+            self._db = db
+
         logger.info(f"Chat history database initialized at {self.db_path}")
 
+    async def close(self) -> None:
+        """Close the database connection."""
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    @asynccontextmanager
+    async def _transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        Run a write transaction on the shared connection.
+
+        The transaction is committed when the block completes. On any error,
+        including cancellation, it is rolled back, so the next writer's commit
+        never stores half of it.
+
+        Yields:
+            The database connection.
+        """
+        async with self._write_lock:
+            db = self._db
+            try:
+                yield db
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+
+    async def _create_schema(self, db: aiosqlite.Connection) -> None:
+        """Create the tables and indexes if they do not exist."""
+        # Create conversations table
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                id TEXT PRIMARY KEY,
+                validation_file TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Create messages table
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                sources JSON,
+                finding_context JSON,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+            )
+        """)
+
+        # Create answer cache table (keyed by a hash of the prompt)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS answer_cache (
+                hash BLOB PRIMARY KEY,
+                answer TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Keep the conversation's updated_at current without a separate
+        # statement per message
+        await db.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_messages_touch_conversation
+            AFTER INSERT ON messages
+            BEGIN
+                UPDATE conversations SET updated_at = CURRENT_TIMESTAMP
+                WHERE id = NEW.conversation_id;
+            END
+        """)
+
+        # Create indexes; the composite index returns a conversation's most
+        # recent messages in order, so LIMIT stops the scan early
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_messages_conv_time
+            ON messages(conversation_id, created_at DESC, id DESC)
+        """)
+        await db.execute("DROP INDEX IF EXISTS idx_messages_conversation")
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_answer_cache_created
+            ON answer_cache(created_at)
+        """)
+
+        await db.commit()
+
+    @staticmethod
+    def new_conversation_id() -> str:
+        """
+        Generate an ID for a new conversation.
+
+        IDs are ULIDs: a millisecond timestamp followed by 80 random bits,
+        as 26 base32 characters. They sort by creation time, so new
+        conversations are appended at the end of the primary key index.
+        """
+        value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+        return "".join(ULID_ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5))
+
     async def create_conversation(
         self,
         validation_file: Optional[str] = None,
@@ -89,9 +197,9 @@ class ChatHistory:
         """
         await self.initialize()
 
-        conversation_id = str(uuid.uuid4())
+        conversation_id = self.new_conversation_id()
 
-        async with aiosqlite.connect(str(self.db_path)) as db:
+        async with self._transaction() as db:
             await db.execute(
                 """
                 INSERT INTO conversations (id, validation_file)
@@ -99,7 +207,6 @@ class ChatHistory:
                 """,
                 (conversation_id, validation_file),
             )
-            await db.commit()
 
         logger.debug(f"Created conversation: {conversation_id}")
         return conversation_id
@@ -111,6 +218,8 @@ class ChatHistory:
         content: str,
         sources: Optional[list] = None,
         finding_context: Optional[dict] = None,
+        sources_json: Optional[str] = None,
+        finding_json: Optional[str] = None,
     ) -> int:
         """
         Add a message to a conversation.
@@ -121,16 +230,23 @@ class ChatHistory:
             content: Message content.
             sources: Optional list of source references.
             finding_context: Optional finding context dict.
+            sources_json: Sources already serialized to JSON; used instead
+                of sources.
+            finding_json: Finding context already serialized to JSON; used
+                instead of finding_context.
 
         Returns:
             Message ID.
         """
         await self.initialize()
 
-        sources_json = json.dumps(sources) if sources else None
-        finding_json = json.dumps(finding_context) if finding_context else None
+        if sources_json is None and sources:
+            sources_json = json.dumps(sources)
+        if finding_json is None and finding_context:
+            finding_json = json.dumps(finding_context)
 
-        async with aiosqlite.connect(str(self.db_path)) as db:
+        # The conversation timestamp is updated by a trigger
+        async with self._transaction() as db:
             cursor = await db.execute(
                 """
                 INSERT INTO messages (conversation_id, role, content, sources, finding_context)
@@ -140,19 +256,66 @@ class ChatHistory:
             )
             message_id = cursor.lastrowid
 
-            # Update conversation timestamp
+        logger.debug(f"Added message {message_id} to conversation {conversation_id}")
+        return message_id
+
+    async def record_turn(
+        self,
+        conversation_id: str,
+        user_message: str,
+        assistant_message: str,
+        sources: Optional[list] = None,
+        finding_context: Optional[dict] = None,
+        validation_file: Optional[str] = None,
+        sources_json: Optional[str] = None,
+        finding_json: Optional[str] = None,
+    ) -> None:
+        """
+        Store a question and its answer in a single transaction.
+
+        Creates the conversation if it does not exist yet.
+
+        Args:
+            conversation_id: Conversation ID.
+            user_message: The user's question.
+            assistant_message: The assistant's answer.
+            sources: Optional list of source references for the answer.
+            finding_context: Optional finding context dict for the question.
+            validation_file: Optional name of the validated file, stored for
+                new conversations.
+            sources_json: Sources already serialized to JSON; used instead
+                of sources.
+            finding_json: Finding context already serialized to JSON; used
+                instead of finding_context.
+        """
+        await self.initialize()
+
+        if sources_json is None and sources:
+            sources_json = json.dumps(sources, separators=(",", ":"))
+        if finding_json is None and finding_context:
+            finding_json = json.dumps(finding_context, separators=(",", ":"))
+
+        async with self._transaction() as db:
             await db.execute(
                 """
-                UPDATE conversations SET updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
+                INSERT OR IGNORE INTO conversations (id, validation_file)
+                VALUES (?, ?)
                 """,
-                (conversation_id,),
+                (conversation_id, validation_file),
             )
 
-            await db.commit()
+            await db.executemany(
+                """
+                INSERT INTO messages (conversation_id, role, content, sources, finding_context)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                [
+                    (conversation_id, "user", user_message, None, finding_json),
+                    (conversation_id, "assistant", assistant_message, sources_json, None),
+                ],
+            )
 
-        logger.debug(f"Added message {message_id} to conversation {conversation_id}")
-        return message_id
+        logger.debug(f"Recorded turn in conversation {conversation_id}")
 
     async def get_conversation(self, conversation_id: str) -> Optional[dict]:
         """
@@ -166,51 +329,50 @@ class ChatHistory:
         """
         await self.initialize()
 
-        async with aiosqlite.connect(str(self.db_path)) as db:
-            db.row_factory = aiosqlite.Row
-
-            # Get conversation
-            cursor = await db.execute(
-                """
-                SELECT id, validation_file, created_at, updated_at
-                FROM conversations WHERE id = ?
-                """,
-                (conversation_id,),
-            )
-            row = await cursor.fetchone()
-
-            if not row:
-                return None
+        db = self._db
+
+        # Get conversation
+        cursor = await db.execute(
+            """
+            SELECT id, validation_file, created_at, updated_at
+            FROM conversations WHERE id = ?
+            """,
+            (conversation_id,),
+        )
+        row = await cursor.fetchone()
+
+        if not row:
+            return None
+
+        conversation = {
+            "id": row["id"],
+            "validation_file": row["validation_file"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "messages": [],
+        }
 
-            conversation = {
-                "id": row["id"],
-                "validation_file": row["validation_file"],
-                "created_at": row["created_at"],
-                "updated_at": row["updated_at"],
-                "messages": [],
+        # Get messages
+        cursor = await db.execute(
+            """
+            SELECT id, role, content, sources, finding_context, created_at
+            FROM messages
+            WHERE conversation_id = ?
+            ORDER BY created_at ASC, id ASC
+            """,
+            (conversation_id,),
+        )
+
+        async for msg_row in cursor:
+            message = {
+                "id": msg_row["id"],
+                "role": msg_row["role"],
+                "content": msg_row["content"],
+                "sources": json.loads(msg_row["sources"]) if msg_row["sources"] else None,
+                "finding_context": json.loads(msg_row["finding_context"]) if msg_row["finding_context"] else None,
+                "created_at": msg_row["created_at"],
             }
-
-            # Get messages
-            cursor = await db.execute(
-                """
-                SELECT id, role, content, sources, finding_context, created_at
-                FROM messages
-                WHERE conversation_id = ?
-                ORDER BY created_at ASC
-                """,
-                (conversation_id,),
-            )
-
-            async for msg_row in cursor:
-                message = {
-                    "id": msg_row["id"],
-                    "role": msg_row["role"],
-                    "content": msg_row["content"],
-                    "sources": json.loads(msg_row["sources"]) if msg_row["sources"] else None,
-                    "finding_context": json.loads(msg_row["finding_context"]) if msg_row["finding_context"] else None,
-                    "created_at": msg_row["created_at"],
-                }
-                conversation["messages"].append(message)
+            conversation["messages"].append(message)
 
         return conversation
 
@@ -233,28 +395,27 @@ class ChatHistory:
 
         messages = []
 
-        async with aiosqlite.connect(str(self.db_path)) as db:
-            db.row_factory = aiosqlite.Row
-
-            cursor = await db.execute(
-                """
-                SELECT role, content, sources, finding_context, created_at
-                FROM messages
-                WHERE conversation_id = ?
-                ORDER BY created_at DESC
-                LIMIT ?
-                """,
-                (conversation_id, limit),
-            )
-
-            async for row in cursor:
-                message = {
-                    "role": row["role"],
-                    "content": row["content"],
-                    "sources": json.loads(row["sources"]) if row["sources"] else None,
-                    "created_at": row["created_at"],
-                }
-                messages.append(message)
+        db = self._db
+
+        cursor = await db.execute(
+            """
+            SELECT role, content, sources, finding_context, created_at
+            FROM messages
+            WHERE conversation_id = ?
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
+            """,
+            (conversation_id, limit),
+        )
+
+        async for row in cursor:
+            message = {
+                "role": row["role"],
+                "content": row["content"],
+                "sources": json.loads(row["sources"]) if row["sources"] else None,
+                "created_at": row["created_at"],
+            }
+            messages.append(message)
 
         # Reverse to get chronological order
         messages.reverse()
@@ -279,48 +440,112 @@ class ChatHistory:
 
         conversations = []
 
-        async with aiosqlite.connect(str(self.db_path)) as db:
-            db.row_factory = aiosqlite.Row
+        db = self._db
+
+        if validation_file:
+            cursor = await db.execute(
+                """
+                SELECT c.id, c.validation_file, c.created_at, c.updated_at,
+                       (SELECT COUNT(1) FROM messages m
+                        WHERE m.conversation_id = c.id) as message_count
+                FROM conversations c
+                WHERE c.validation_file = ?
+                ORDER BY c.updated_at DESC
+                LIMIT ?
+                """,
+                (validation_file, limit),
+            )
+        else:
+            cursor = await db.execute(
+                """
+                SELECT c.id, c.validation_file, c.created_at, c.updated_at,
+                       (SELECT COUNT(1) FROM messages m
+                        WHERE m.conversation_id = c.id) as message_count
+                FROM conversations c
+                ORDER BY c.updated_at DESC
+                LIMIT ?
+                """,
+                (limit,),
+            )
 
-            if validation_file:
-                cursor = await db.execute(
-                    """
-                    SELECT c.id, c.validation_file, c.created_at, c.updated_at,
-                           COUNT(m.id) as message_count
-                    FROM conversations c
-                    LEFT JOIN messages m ON c.id = m.conversation_id
-                    WHERE c.validation_file = ?
-                    GROUP BY c.id
-                    ORDER BY c.updated_at DESC
-                    LIMIT ?
-                    """,
-                    (validation_file, limit),
-                )
-            else:
-                cursor = await db.execute(
-                    """
-                    SELECT c.id, c.validation_file, c.created_at, c.updated_at,
-                           COUNT(m.id) as message_count
-                    FROM conversations c
-                    LEFT JOIN messages m ON c.id = m.conversation_id
-                    GROUP BY c.id
-                    ORDER BY c.updated_at DESC
-                    LIMIT ?
-                    """,
-                    (limit,),
-                )
-
-            async for row in cursor:
-                conversations.append({
-                    "id": row["id"],
-                    "validation_file": row["validation_file"],
-                    "created_at": row["created_at"],
-                    "updated_at": row["updated_at"],
-                    "message_count": row["message_count"],
-                })
+        async for row in cursor:
+            conversations.append({
+                "id": row["id"],
+                "validation_file": row["validation_file"],
+                "created_at": row["created_at"],
+                "updated_at": row["updated_at"],
+                "message_count": row["message_count"],
+            })
 
         return conversations
 
+    async def get_cached_answer(self, prompt_hash: bytes) -> Optional[str]:
+        """
+        Get a cached answer.
+
+        Args:
+            prompt_hash: Hash of the prompt that produced the answer.
+
+        Returns:
+            The cached answer, or None if not found.
+        """
+        await self.initialize()
+
+        cursor = await self._db.execute(
+            """
+            SELECT answer FROM answer_cache
+            WHERE hash = ? AND created_at >= datetime('now', ?)
+            """,
+            (prompt_hash, ANSWER_CACHE_MAX_AGE),
+        )
+        row = await cursor.fetchone()
+        return row["answer"] if row else None
+
+    async def store_cached_answer(self, prompt_hash: bytes, answer: str) -> None:
+        """
+        Store an answer in the cache.
+
+        Every ANSWER_CACHE_PRUNE_INTERVAL answers, expired answers and the
+        oldest ones beyond ANSWER_CACHE_MAX_ENTRIES are removed.
+
+        Args:
+            prompt_hash: Hash of the prompt that produced the answer.
+            answer: The answer to cache.
+        """
+        await self.initialize()
+
+        async with self._transaction() as db:
+            await db.execute(
+                """
+                INSERT OR REPLACE INTO answer_cache (hash, answer)
+                VALUES (?, ?)
+                """,
+                (prompt_hash, answer),
+            )
+
+            self._answers_since_prune += 1
+            if self._answers_since_prune >= ANSWER_CACHE_PRUNE_INTERVAL:
+                self._answers_since_prune = 0
+                await self._prune_answer_cache(db)
+
+    @staticmethod
+    async def _prune_answer_cache(db: aiosqlite.Connection) -> None:
+        """Remove expired answers and the oldest answers beyond the maximum."""
+        await db.execute(
+            "DELETE FROM answer_cache WHERE created_at < datetime('now', ?)",
+            (ANSWER_CACHE_MAX_AGE,),
+        )
+        await db.execute(
+            """
+            DELETE FROM answer_cache WHERE hash IN (
+                SELECT hash FROM answer_cache
+                ORDER BY created_at DESC, rowid DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (ANSWER_CACHE_MAX_ENTRIES,),
+        )
+
     async def delete_conversation(self, conversation_id: str) -> bool:
         """
         Delete a conversation and all its messages.
@@ -333,7 +558,7 @@ class ChatHistory:
         """
         await self.initialize()
 
-        async with aiosqlite.connect(str(self.db_path)) as db:
+        async with self._transaction() as db:
             # Delete messages first
             await db.execute(
                 "DELETE FROM messages WHERE conversation_id = ?",
@@ -346,9 +571,7 @@ class ChatHistory:
                 (conversation_id,),
             )
 
-            await db.commit()
-
-            return cursor.rowcount > 0
+        return cursor.rowcount > 0
 
     async def get_stats(self) -> dict:
         """
@@ -359,14 +582,15 @@ class ChatHistory:
         """
         await self.initialize()
 
-        async with aiosqlite.connect(str(self.db_path)) as db:
-            cursor = await db.execute("SELECT COUNT(*) FROM conversations")
-            row = await cursor.fetchone()
-            conversation_count = row[0]
+        db = self._db
+
+        cursor = await db.execute("SELECT COUNT(*) FROM conversations")
+        row = await cursor.fetchone()
+        conversation_count = row[0]
 
-            cursor = await db.execute("SELECT COUNT(*) FROM messages")
-            row = await cursor.fetchone()
-            message_count = row[0]
+        cursor = await db.execute("SELECT COUNT(*) FROM messages")
+        row = await cursor.fetchone()
+        message_count = row[0]
 
         return {
             "conversation_count": conversation_count,
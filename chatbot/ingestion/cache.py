@@ -0,0 +1,107 @@
+"""
+On-disk cache of processed documents per source file.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import orjson
+
+from .ids import short_hash
+
+logger = logging.getLogger(__name__)
+
+# Bump when processor output changes, so stale entries are ignored
+CACHE_VERSION = 1
+
+
+class IngestionCache:
+    """
+    Cache of the documents created from a source file.
+
+    Entries are keyed by the file path and a processor-specific variant,
+    and are valid as long as the file's modification time and size are
+    unchanged. The cache only holds a directory path, so it can be passed
+    to worker processes.
+    """
+
+    def __init__(self, cache_dir: Path):
+        """
+        Initialize the ingestion cache.
+
+        Args:
+            cache_dir: Directory to store cache entries in.
+        """
+        self.cache_dir = cache_dir
+
+    def load(self, filepath: Path, variant: str = "") -> Optional[list[dict]]:
+        """
+        Get the cached documents for a file.
+
+        Args:
+            filepath: Source file the documents were created from.
+            variant: Processor settings the documents depend on.
+
+        Returns:
+            The cached documents, or None if there is no valid entry.
+        """
+        try:
+            stat = filepath.stat()
+            entry = orjson.loads(self._entry_path(filepath, variant).read_bytes())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+
+        if (
+            entry.get("version") != CACHE_VERSION
+            or entry.get("source") != str(filepath.resolve())
+            or entry.get("variant") != variant
+            or entry.get("mtime_ns") != stat.st_mtime_ns
+            or entry.get("size") != stat.st_size
+        ):
+            return None
+
+        logger.info(f"Using cached documents for {filepath.name}")
+        return entry["docs"]
+
+    def store(self, filepath: Path, docs: list[dict], variant: str = "") -> None:
+        """
+        Cache the documents created from a file.
+
+        Empty results are not cached, so a file is retried once a missing
+        parser becomes available.
+
+        Args:
+            filepath: Source file the documents were created from.
+            docs: Documents created from the file.
+            variant: Processor settings the documents depend on.
+        """
+        if not docs:
+            return
+
+        try:
+            stat = filepath.stat()
+            entry = {
+                "version": CACHE_VERSION,
+                "source": str(filepath.resolve()),
+                "variant": variant,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "docs": docs,
+            }
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entry_path = self._entry_path(filepath, variant)
+
+            # Write to a temporary file first so readers never see a partial entry
+            tmp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(orjson.dumps(entry))
+            os.replace(tmp_path, entry_path)
+        except (OSError, TypeError) as e:
+            logger.warning(f"Could not cache documents for {filepath.name}: {e}")
+
+    def _entry_path(self, filepath: Path, variant: str) -> Path:
+        """Get the cache entry path for a file."""
+        key = short_hash(f"{filepath.resolve()}:{variant}")
+        return self.cache_dir / f"{filepath.stem}_{key}.json"
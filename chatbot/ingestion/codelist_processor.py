@@ -2,26 +2,38 @@
 Codelist processor for indexing JSON codelist files.
 """
 
-import hashlib
-import json
 import logging
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
+
+import orjson
+
+from .cache import IngestionCache
+from .ids import short_hash
 
 logger = logging.getLogger(__name__)
 
+# Hierarchy files from this size on are stream-parsed (if ijson is installed)
+STREAM_PARSE_MIN_BYTES = 64 * 1024 * 1024
+
 
 class CodelistProcessor:
     """Processor for converting JSON codelists to searchable documents."""
 
-    def __init__(self, sivi_dir: Path):
+    def __init__(self, sivi_dir: Path, cache: Optional[IngestionCache] = None):
         """
         Initialize the codelist processor.
 
         Args:
             sivi_dir: Path to the SIVI directory containing JSON files.
+            cache: Optional cache of documents from unchanged files.
         """
         self.sivi_dir = sivi_dir
+        self.cache = cache
 
     def process_all(self) -> list[dict]:
         """
@@ -38,129 +50,217 @@ class CodelistProcessor:
 
         logger.info(f"Found {len(json_files)} JSON codelist files")
 
+        # Unchanged files are taken from the cache without starting workers
+        results = {}
+        if self.cache:
+            for filepath in json_files:
+                docs = self.cache.load(filepath)
+                if docs is not None:
+                    results[filepath] = docs
+        pending = [filepath for filepath in json_files if filepath not in results]
+
+        if len(pending) <= 1:
+            for filepath in pending:
+                results[filepath] = self._process_uncached(filepath)
+        else:
+            # Files are independent, so they are processed in parallel
+            workers = min(len(pending), os.cpu_count() or 1)
+            # Spawned, as this runs in a worker thread of the API process
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                args = [(self.sivi_dir, self.cache)] * len(pending)
+                docs_per_file = executor.map(_process_codelist_file, args, pending)
+                for filepath, docs in zip(pending, docs_per_file):
+                    results[filepath] = docs
+
         for filepath in json_files:
-            logger.info(f"Processing JSON: {filepath.name}")
-            if "hierarchy" in filepath.name:
-                docs = self._process_hierarchy(filepath)
-            else:
-                docs = self._process_codelist(filepath)
-            all_docs.extend(docs)
-            logger.info(f"Created {len(docs)} documents from {filepath.name}")
+            all_docs.extend(results[filepath])
 
         return all_docs
 
+    def process_file(self, filepath: Path) -> list[dict]:
+        """
+        Process a single hierarchy or codelist JSON file.
+
+        Args:
+            filepath: Path to the JSON file.
+
+        Returns:
+            List of document chunks.
+        """
+        if self.cache:
+            docs = self.cache.load(filepath)
+            if docs is not None:
+                return docs
+
+        return self._process_uncached(filepath)
+
+    def _process_uncached(self, filepath: Path) -> list[dict]:
+        """Process a JSON file and store the result in the cache, if any."""
+        logger.info(f"Processing JSON: {filepath.name}")
+        if "hierarchy" in filepath.name:
+            docs = self._process_hierarchy(filepath)
+        else:
+            docs = self._process_codelist(filepath)
+        logger.info(f"Created {len(docs)} documents from {filepath.name}")
+
+        if self.cache:
+            self.cache.store(filepath, docs)
+        return docs
+
     def _process_hierarchy(self, filepath: Path) -> list[dict]:
         """Process a hierarchy JSON file."""
-        docs = []
+        if filepath.stat().st_size >= STREAM_PARSE_MIN_BYTES:
+            try:
+                return self._stream_hierarchy(filepath)
+            except ImportError:
+                logger.warning(f"ijson not available, parsing {filepath.name} in memory")
 
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = _load_json(filepath)
         except Exception as e:
             logger.error(f"Error reading {filepath}: {e}")
-            return docs
+            return []
 
         common = data.get("commonFunctional", {})
-        table_name = common.get("tableName", "")
-        table_desc = common.get("tableDescription", "")
-
-        # Create overview document
         afs_table = data.get("afsTable", {})
         code_values = afs_table.get("codeValues", [])
 
-        overview_content = f"Codelijst: {table_name}\n"
-        overview_content += f"Beschrijving: {table_desc}\n\n"
-        overview_content += f"Dit is een hierarchische codelijst met {len(code_values)} hoofdcategorieën.\n"
-
-        docs.append({
-            "id": f"codelist_hierarchy_{hashlib.md5(table_name.encode()).hexdigest()[:8]}",
-            "content": overview_content,
-            "metadata": {
-                "source_type": "codelist",
-                "source_file": filepath.name,
-                "title": table_name,
-                "codelist_type": "hierarchy",
-            },
-        })
+        # Create overview document
+        docs = [self._hierarchy_overview(common, len(code_values), filepath.name)]
 
-        # Process each branch code recursively
-        for code_data in code_values:
-            branch_docs = self._process_branch_code(code_data, filepath.name, table_name, [])
-            docs.extend(branch_docs)
+        # Process the branch codes, depth first
+        docs.extend(self._process_branch_codes(code_values, filepath.name))
 
         return docs
 
-    def _process_branch_code(
-        self,
-        code_data: dict,
-        filename: str,
-        table_name: str,
-        path: list[str],
-    ) -> list[dict]:
-        """Process a single branch code and its children."""
-        docs = []
+    def _stream_hierarchy(self, filepath: Path) -> list[dict]:
+        """
+        Process a hierarchy JSON file without loading it into memory at once.
 
-        value = code_data.get("value", "")
-        description = code_data.get("description", "")
-        short_desc = code_data.get("shortDescription", "")
-        node_desc = code_data.get("nodeDescription", "")
+        Top-level branch codes are parsed and processed one at a time.
 
-        if not value:
-            return docs
+        Raises:
+            ImportError: If ijson is not installed.
+        """
+        import ijson
 
-        # Build path for this node
-        current_path = path + [value]
-        path_str = " > ".join(current_path)
-
-        # Create document for this branch
-        content = f"Branchecode: {value}\n"
-        content += f"Beschrijving: {description}\n"
-        if short_desc and short_desc != description:
-            content += f"Korte beschrijving: {short_desc}\n"
-        if node_desc:
-            content += f"Node beschrijving: {node_desc}\n"
-        content += f"\nHierarchie pad: {path_str}\n"
-
-        # Add information about parent branch
-        if path:
-            content += f"Onderdeel van: {path[-1]} ({' > '.join(path)})\n"
-
-        # Add children summary
-        children = code_data.get("code", [])
-        if children:
-            child_codes = [c.get("value", "") for c in children if c.get("value")]
-            content += f"\nSubbranches ({len(children)}): {', '.join(child_codes[:10])}"
-            if len(child_codes) > 10:
-                content += f"... (en {len(child_codes) - 10} meer)"
-
-        doc_id = f"branch_{value}_{hashlib.md5(value.encode()).hexdigest()[:8]}"
-        docs.append({
-            "id": doc_id,
-            "content": content,
+        filename = filepath.name
+        branch_docs = []
+        count = 0
+
+        try:
+            with open(filepath, "rb") as f:
+                common = next(ijson.items(f, "commonFunctional"), {})
+
+            with open(filepath, "rb") as f:
+                for code_data in ijson.items(f, "afsTable.codeValues.item"):
+                    branch_docs.extend(self._process_branch_codes([code_data], filename))
+                    count += 1
+        except Exception as e:
+            logger.error(f"Error reading {filepath}: {e}")
+            return []
+
+        return [self._hierarchy_overview(common, count, filename)] + branch_docs
+
+    def _hierarchy_overview(self, common: dict, count: int, filename: str) -> dict:
+        """Create the overview document of a hierarchy codelist."""
+        table_name = common.get("tableName", "")
+        table_desc = common.get("tableDescription", "")
+
+        overview_content = (
+            f"Codelijst: {table_name}\n"
+            f"Beschrijving: {table_desc}\n\n"
+            f"Dit is een hierarchische codelijst met {count} hoofdcategorieën.\n"
+        )
+
+        return {
+            "id": f"codelist_hierarchy_{short_hash(table_name)}",
+            "content": overview_content,
             "metadata": {
                 "source_type": "codelist",
                 "source_file": filename,
-                "title": f"Branche {value}: {short_desc or description[:50]}",
-                "codelist_type": "branch",
-                "branch_code": value,
-                "parent_branch": path[-1] if path else None,
+                "title": table_name,
+                "codelist_type": "hierarchy",
             },
-        })
+        }
 
-        # Process children recursively
-        for child_data in children:
-            child_docs = self._process_branch_code(child_data, filename, table_name, current_path)
-            docs.extend(child_docs)
+    def _process_branch_codes(self, code_values: list[dict], filename: str) -> Iterator[dict]:
+        """
+        Process branch codes and all their descendants.
 
-        return docs
+        Walks the hierarchy with an explicit stack instead of recursion;
+        documents are yielded in depth-first order, parents before children.
+        """
+        # Entries are (code data, path of ancestor values)
+        stack = [(code_data, ()) for code_data in reversed(code_values)]
+
+        while stack:
+            code_data, path = stack.pop()
+
+            value = code_data.get("value", "")
+            description = code_data.get("description", "")
+            short_desc = code_data.get("shortDescription", "")
+            node_desc = code_data.get("nodeDescription", "")
+
+            # A node without a value is skipped with its children
+            if not value:
+                continue
+
+            # Build path for this node
+            current_path = path + (value,)
+            path_str = " > ".join(current_path)
+
+            # Create document for this branch
+            parts = [f"Branchecode: {value}\n", f"Beschrijving: {description}\n"]
+            if short_desc and short_desc != description:
+                parts.append(f"Korte beschrijving: {short_desc}\n")
+            if node_desc:
+                parts.append(f"Node beschrijving: {node_desc}\n")
+            parts.append(f"\nHierarchie pad: {path_str}\n")
+
+            # Add information about parent branch
+            if path:
+                parts.append(f"Onderdeel van: {path[-1]} ({' > '.join(path)})\n")
+
+            # Add children summary
+            children = code_data.get("code", [])
+            if children:
+                child_codes = [child_value for c in children if (child_value := c.get("value"))]
+                parts.append(f"\nSubbranches ({len(children)}): {', '.join(child_codes[:10])}")
+                if len(child_codes) > 10:
+                    parts.append(f"... (en {len(child_codes) - 10} meer)")
+            content = "".join(parts)
+
+            # The same code can occur at several places in the hierarchy,
+            # so the ID is derived from the full path
+            doc_id = f"branch_{value}_{short_hash(f'{filename}:{path_str}')}"
+            yield {
+                "id": doc_id,
+                "content": content,
+                "metadata": {
+                    "source_type": "codelist",
+                    "source_file": filename,
+                    "title": f"Branche {value}: {short_desc or description[:50]}",
+                    "codelist_type": "branch",
+                    "branch_code": value,
+                    "parent_branch": path[-1] if path else None,
+                },
+            }
+
+            # Children are processed next, in their original order
+            for child_data in reversed(children):
+                stack.append((child_data, current_path))
 
     def _process_codelist(self, filepath: Path) -> list[dict]:
         """Process a flat codelist JSON file."""
+        filename = filepath.name
         docs = []
 
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = _load_json(filepath)
         except Exception as e:
             logger.error(f"Error reading {filepath}: {e}")
             return docs
@@ -173,29 +273,32 @@ class CodelistProcessor:
         code_values = afs_table.get("codeValues", [])
 
         # Create overview document
-        overview_content = f"Codelijst: {table_name}\n"
-        overview_content += f"Beschrijving: {table_desc}\n\n"
-        overview_content += f"Aantal codes: {len(code_values)}\n\n"
+        parts = [
+            f"Codelijst: {table_name}\n",
+            f"Beschrijving: {table_desc}\n\n",
+            f"Aantal codes: {len(code_values)}\n\n",
+        ]
 
         # Add sample of codes
-        sample_codes = []
-        for code_data in code_values[:20]:
-            value = code_data.get("value", "")
-            desc = code_data.get("description", "")
-            if value:
-                sample_codes.append(f"- {value}: {desc}")
+        sample_codes = [
+            f"- {code_data['value']}: {code_data.get('description', '')}"
+            for code_data in code_values[:20]
+            if code_data.get("value")
+        ]
 
         if sample_codes:
-            overview_content += "Voorbeeld codes:\n" + "\n".join(sample_codes)
+            parts.append("Voorbeeld codes:\n")
+            parts.append("\n".join(sample_codes))
             if len(code_values) > 20:
-                overview_content += f"\n... en {len(code_values) - 20} meer codes"
+                parts.append(f"\n... en {len(code_values) - 20} meer codes")
+        overview_content = "".join(parts)
 
         docs.append({
-            "id": f"codelist_flat_{hashlib.md5(table_name.encode()).hexdigest()[:8]}",
+            "id": f"codelist_flat_{short_hash(table_name)}",
             "content": overview_content,
             "metadata": {
                 "source_type": "codelist",
-                "source_file": filepath.name,
+                "source_file": filename,
                 "title": table_name,
                 "codelist_type": "flat",
                 "code_count": len(code_values),
@@ -207,27 +310,48 @@ class CodelistProcessor:
         for i in range(0, len(code_values), batch_size):
             batch = code_values[i : i + batch_size]
 
-            batch_content = f"Codes uit codelijst {table_name}:\n\n"
+            lines = [f"Codes uit codelijst {table_name}:\n\n"]
             for code_data in batch:
                 value = code_data.get("value", "")
                 desc = code_data.get("description", "")
                 short_desc = code_data.get("shortDescription", "")
                 if value:
-                    batch_content += f"Code {value}: {desc}"
                     if short_desc and short_desc != desc:
-                        batch_content += f" ({short_desc})"
-                    batch_content += "\n"
+                        lines.append(f"Code {value}: {desc} ({short_desc})\n")
+                    else:
+                        lines.append(f"Code {value}: {desc}\n")
+            batch_content = "".join(lines)
 
-            batch_id = f"codelist_batch_{table_name}_{i}_{hashlib.md5(batch_content.encode()).hexdigest()[:8]}"
+            batch_id = f"codelist_batch_{table_name}_{i}_{short_hash(batch_content)}"
             docs.append({
                 "id": batch_id,
                 "content": batch_content,
                 "metadata": {
                     "source_type": "codelist",
-                    "source_file": filepath.name,
+                    "source_file": filename,
                     "title": f"{table_name} codes ({i+1}-{min(i+batch_size, len(code_values))})",
                     "codelist_type": "codes_batch",
                 },
             })
 
         return docs
+
+
+def _load_json(filepath: Path) -> dict:
+    """
+    Parse a JSON file without first copying it into a bytes object.
+
+    The file is memory-mapped and orjson parses directly from the mapping.
+    """
+    with open(filepath, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, "madvise"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        return orjson.loads(memoryview(mm))
+
+
+def _process_codelist_file(
+    args: tuple[Path, Optional[IngestionCache]], filepath: Path
+) -> list[dict]:
+    """Process one codelist file in a worker process."""
+    sivi_dir, cache = args
+    return CodelistProcessor(sivi_dir, cache)._process_uncached(filepath)
@@ -2,15 +2,26 @@
 Expert knowledge processor for loading YAML expert rules.
 """
 
-import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
 import yaml
 
+from .ids import short_hash
+
+try:
+    # libyaml-backed loader, much faster than the pure-Python one
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 logger = logging.getLogger(__name__)
 
+# Maximum number of YAML files parsed concurrently
+MAX_LOAD_WORKERS = 8
+
 
 class ExpertProcessor:
     """Processor for loading expert knowledge from YAML files."""
@@ -43,7 +54,7 @@ class ExpertProcessor:
 
         try:
             with open(filepath, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
+                data = yaml.load(f, Loader=SafeLoader)
         except Exception as e:
             logger.error(f"Error reading {filepath}: {e}")
             return []
@@ -83,23 +94,24 @@ class ExpertProcessor:
             return docs
 
         # Main rule document
-        content = f"Expert Regel {rule_id}: {title}\n\n"
-        content += f"{description}\n\n"
+        parts = [f"Expert Regel {rule_id}: {title}\n\n", f"{description}\n\n"]
 
         if affected_entities:
-            content += f"Betreffende entiteiten: {', '.join(affected_entities)}\n"
+            parts.append(f"Betreffende entiteiten: {', '.join(affected_entities)}\n")
         if severity:
-            content += f"Ernst niveau: {severity}\n"
+            parts.append(f"Ernst niveau: {severity}\n")
         if related_codes:
-            content += f"Gerelateerde foutcodes: {', '.join(related_codes)}\n"
+            parts.append(f"Gerelateerde foutcodes: {', '.join(related_codes)}\n")
 
         if handbook_refs:
-            content += "\nHandboek referenties:\n"
+            parts.append("\nHandboek referenties:\n")
             for ref in handbook_refs:
-                content += f"- {ref.get('file', '')} sectie {ref.get('section', '')}"
+                parts.append(f"- {ref.get('file', '')} sectie {ref.get('section', '')}")
                 if ref.get('page'):
-                    content += f" pagina {ref['page']}"
-                content += "\n"
+                    parts.append(f" pagina {ref['page']}")
+                parts.append("\n")
+
+        content = "".join(parts)
 
         doc_id = f"expert_rule_{rule_id}"
         docs.append({
@@ -122,9 +134,11 @@ class ExpertProcessor:
             correct = example.get("correct", "")
             explanation = example.get("explanation", "")
 
-            example_content = f"Voorbeeld bij regel {rule_id} ({title}):\n\n"
-            example_content += f"FOUT: {incorrect}\n"
-            example_content += f"CORRECT: {correct}\n"
+            example_content = (
+                f"Voorbeeld bij regel {rule_id} ({title}):\n\n"
+                f"FOUT: {incorrect}\n"
+                f"CORRECT: {correct}\n"
+            )
             if explanation:
                 example_content += f"\nUitleg: {explanation}\n"
 
@@ -152,13 +166,12 @@ class ExpertProcessor:
         if not question or not answer:
             return None
 
-        content = f"Vraag: {question}\n\n"
-        content += f"Antwoord:\n{answer}\n"
+        content = f"Vraag: {question}\n\nAntwoord:\n{answer}\n"
 
         if related_rules:
             content += f"\nGerelateerde regels: {', '.join(related_rules)}"
 
-        doc_id = f"expert_faq_{hashlib.md5(question.encode()).hexdigest()[:8]}"
+        doc_id = f"expert_faq_{short_hash(question)}"
         return {
             "id": doc_id,
             "content": content,
@@ -190,8 +203,13 @@ class ExpertProcessor:
             # Try the default file
             return self.process()
 
-        for filepath in expert_files:
-            docs = self.process(filepath.name)
-            all_docs.extend(docs)
+        if len(expert_files) == 1:
+            return self.process(expert_files[0].name)
+
+        # libyaml releases the GIL while parsing, so threads overlap
+        workers = min(MAX_LOAD_WORKERS, len(expert_files))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for docs in executor.map(self.process, [f.name for f in expert_files]):
+                all_docs.extend(docs)
 
         return all_docs
@@ -0,0 +1,21 @@
+"""
+Document ID helpers for the ingestion processors.
+"""
+
+import hashlib
+
+
+def short_hash(text: str) -> str:
+    """
+    Get a short, stable hash of a text for use in document IDs.
+
+    Not for security: IDs only need to tell documents apart. BLAKE2b with
+    a 4 byte digest is faster than MD5 and needs no extra dependency.
+
+    Args:
+        text: Text to hash.
+
+    Returns:
+        8 hexadecimal characters.
+    """
+    return hashlib.blake2b(text.encode(), digest_size=4).hexdigest()
@@ -2,11 +2,18 @@
 PDF processor for extracting and chunking text from PDF documents.
 """
 
-import hashlib
+import io
 import logging
+import multiprocessing
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
+
+from .cache import IngestionCache
+from .ids import short_hash
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +21,43 @@ logger = logging.getLogger(__name__)
 DEFAULT_CHUNK_SIZE = 1000  # characters
 DEFAULT_CHUNK_OVERLAP = 200  # characters
 
+# Text cleanup patterns
+EXCESS_NEWLINES_RE = re.compile(r"\n{3,}")
+EXCESS_SPACES_RE = re.compile(r" {2,}")
+PAGE_NUMBER_RE = re.compile(r"^\d+\s*$", re.MULTILINE)
+PAGE_FOOTER_RE = re.compile(r"^Pagina \d+ van \d+\s*$", re.MULTILINE)
+
+# Section header patterns, tried in order
+SECTION_PATTERNS = [
+    re.compile(pattern, re.MULTILINE | re.IGNORECASE)
+    for pattern in (
+        r"^(\d+\.[\d\.]*)\s+(.+?)(?:\n|$)",  # "1.2.3 Title"
+        r"^(Hoofdstuk\s+\d+)[\s:]+(.+?)(?:\n|$)",  # "Hoofdstuk 1: Title"
+        r"^(Sectie\s+[\d\.]+)[\s:]+(.+?)(?:\n|$)",  # "Sectie 1.2: Title"
+        r"^(Bijlage\s+\w+)[\s:]+(.+?)(?:\n|$)",  # "Bijlage A: Title"
+    )
+]
+
+# Section headers are looked for in this many leading characters of a page
+SECTION_PREFIX_CHARS = 200
+
+
+@lru_cache(maxsize=1024)
+def _match_section(prefix: str) -> Optional[str]:
+    """Match the section header patterns against the start of a page."""
+    for pattern in SECTION_PATTERNS:
+        match = pattern.search(prefix)
+        if match:
+            return f"{match.group(1)} {match.group(2)[:50]}"
+
+    return None
+
+
+@lru_cache(maxsize=256)
+def _document_title(filename: str) -> str:
+    """Derive a readable title from a PDF filename; shared by all its chunks."""
+    return filename.replace(".pdf", "").replace("-", " ").replace("_", " ")
+
 
 class PDFProcessor:
     """Processor for extracting text from PDF documents."""
@@ -22,6 +66,7 @@ class PDFProcessor:
         self,
         chunk_size: int = DEFAULT_CHUNK_SIZE,
         chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+        cache: Optional[IngestionCache] = None,
     ):
         """
         Initialize the PDF processor.
@@ -29,9 +74,14 @@ class PDFProcessor:
         Args:
             chunk_size: Target size for text chunks in characters.
             chunk_overlap: Overlap between consecutive chunks.
+            cache: Optional cache of chunks from unchanged files.
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.cache = cache
+
+        # Cached chunks are only valid for the same chunk settings
+        self._cache_variant = f"{chunk_size}:{chunk_overlap}"
 
     def process(self, pdf_path: Path) -> list[dict]:
         """
@@ -47,22 +97,41 @@ class PDFProcessor:
             logger.warning(f"PDF not found: {pdf_path}")
             return []
 
+        if self.cache:
+            chunks = self.cache.load(pdf_path, self._cache_variant)
+            if chunks is not None:
+                return chunks
+
+        return self._process_uncached(pdf_path)
+
+    def _process_uncached(self, pdf_path: Path) -> list[dict]:
+        """Process a PDF file and store the result in the cache, if any."""
         logger.info(f"Processing PDF: {pdf_path.name}")
 
+        # Read the file once; both extractors parse from memory
+        try:
+            data = pdf_path.read_bytes()
+        except OSError as e:
+            logger.error(f"Error reading PDF {pdf_path}: {e}")
+            return []
+
         # Extract text using PyMuPDF (faster) with pdfplumber fallback for tables
-        pages = self._extract_pages(pdf_path)
+        pages = self._extract_pages(data)
 
         if not pages:
             logger.warning(f"No text extracted from: {pdf_path}")
             return []
 
         # Chunk the text with section awareness
-        chunks = self._chunk_pages(pages, pdf_path.name)
+        chunks = list(self._chunk_pages(pages, pdf_path.name))
 
         logger.info(f"Created {len(chunks)} chunks from {pdf_path.name}")
+
+        if self.cache:
+            self.cache.store(pdf_path, chunks, self._cache_variant)
         return chunks
 
-    def _extract_pages(self, pdf_path: Path) -> list[dict]:
+    def _extract_pages(self, data: bytes) -> list[dict]:
         """
         Extract text from each page of the PDF.
 
@@ -73,44 +142,46 @@ class PDFProcessor:
         try:
             import fitz  # PyMuPDF
 
-            doc = fitz.open(str(pdf_path))
+            # Join words hyphenated across lines and expand ligatures, so
+            # extracted text matches what users search for
+            flags = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_DEHYPHENATE | fitz.TEXT_MEDIABOX_CLIP
 
-            for page_num, page in enumerate(doc, 1):
-                text = page.get_text("text")
+            # Closed even when extraction fails halfway
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                for page_num, page in enumerate(doc, 1):
+                    text = page.get_text("text", flags=flags)
 
-                # Clean up the text
-                text = self._clean_text(text)
-
-                if text.strip():
-                    # Try to detect section headers
-                    section = self._detect_section(text)
+                    # Clean up the text
+                    text = self._clean_text(text)
 
-                    pages.append({
-                        "page": page_num,
-                        "text": text,
-                        "section": section,
-                    })
+                    if text:
+                        # Try to detect section headers
+                        section = self._detect_section(text)
 
-            doc.close()
+                        pages.append({
+                            "page": page_num,
+                            "text": text,
+                            "section": section,
+                        })
 
         except ImportError:
             logger.warning("PyMuPDF not available, trying pdfplumber")
-            pages = self._extract_with_pdfplumber(pdf_path)
+            pages = self._extract_with_pdfplumber(data)
         except Exception as e:
             logger.error(f"Error extracting PDF with PyMuPDF: {e}")
             # Try pdfplumber as fallback
-            pages = self._extract_with_pdfplumber(pdf_path)
+            pages = self._extract_with_pdfplumber(data)
 
         return pages
 
-    def _extract_with_pdfplumber(self, pdf_path: Path) -> list[dict]:
+    def _extract_with_pdfplumber(self, data: bytes) -> list[dict]:
         """Extract text using pdfplumber (better for tables)."""
         pages = []
 
         try:
             import pdfplumber
 
-            with pdfplumber.open(str(pdf_path)) as pdf:
+            with pdfplumber.open(io.BytesIO(data)) as pdf:
                 for page_num, page in enumerate(pdf.pages, 1):
                     text = page.extract_text() or ""
 
@@ -124,7 +195,7 @@ class PDFProcessor:
 
                     text = self._clean_text(text)
 
-                    if text.strip():
+                    if text:
                         section = self._detect_section(text)
                         pages.append({
                             "page": page_num,
@@ -144,24 +215,31 @@ class PDFProcessor:
         if not table:
             return ""
 
-        rows = []
-        for row in table:
-            if row:
-                # Filter out None values and join
-                cells = [str(cell) if cell else "" for cell in row]
-                rows.append(" | ".join(cells))
-
-        return "\n".join(rows)
+        # Empty cells (None) become blank; pdfplumber cells are mostly str already
+        return "\n".join(
+            " | ".join(
+                cell if type(cell) is str else str(cell) if cell else ""
+                for cell in row
+            )
+            for row in table
+            if row
+        )
 
     def _clean_text(self, text: str) -> str:
         """Clean extracted text."""
+        # Most pages need only some of the passes; a substring check is much
+        # cheaper than a regex scan that finds nothing
+
         # Remove excessive whitespace
-        text = re.sub(r"\n{3,}", "\n\n", text)
-        text = re.sub(r" {2,}", " ", text)
+        if "\n\n\n" in text:
+            text = EXCESS_NEWLINES_RE.sub("\n\n", text)
+        if "  " in text:
+            text = EXCESS_SPACES_RE.sub(" ", text)
 
         # Remove page numbers and headers/footers (common patterns)
-        text = re.sub(r"^\d+\s*$", "", text, flags=re.MULTILINE)
-        text = re.sub(r"^Pagina \d+ van \d+\s*$", "", text, flags=re.MULTILINE)
+        text = PAGE_NUMBER_RE.sub("", text)
+        if "Pagina " in text:
+            text = PAGE_FOOTER_RE.sub("", text)
 
         return text.strip()
 
@@ -169,32 +247,29 @@ class PDFProcessor:
         """
         Try to detect section header from text.
 
+        Only the start of the page is searched; consecutive pages often
+        start the same way, so results are memoized per prefix.
+
         Returns section identifier if found.
         """
-        # Look for common section patterns
-        patterns = [
-            r"^(\d+\.[\d\.]*)\s+(.+?)(?:\n|$)",  # "1.2.3 Title"
-            r"^(Hoofdstuk\s+\d+)[\s:]+(.+?)(?:\n|$)",  # "Hoofdstuk 1: Title"
-            r"^(Sectie\s+[\d\.]+)[\s:]+(.+?)(?:\n|$)",  # "Sectie 1.2: Title"
-            r"^(Bijlage\s+\w+)[\s:]+(.+?)(?:\n|$)",  # "Bijlage A: Title"
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, text, re.MULTILINE | re.IGNORECASE)
-            if match:
-                return f"{match.group(1)} {match.group(2)[:50]}"
-
-        return None
-
-    def _chunk_pages(self, pages: list[dict], filename: str) -> list[dict]:
+        return _match_section(text[:SECTION_PREFIX_CHARS])
+
+    def _chunk_pages(self, pages: list[dict], filename: str) -> Iterator[dict]:
         """
         Chunk pages into smaller documents while preserving context.
 
-        Uses sentence-aware chunking with section tracking.
+        Uses sentence-aware chunking with section tracking. Chunks are
+        yielded as soon as they are complete.
         """
-        chunks = []
+        chunk_size = self.chunk_size
+        chunk_overlap = self.chunk_overlap
         current_section = None
 
+        # Paragraphs of the chunk being built; joined only when it is saved
+        buffer: list[str] = []
+        buffer_len = 0  # length of "\n\n".join(buffer)
+        chunk_start_page = None
+
         for page_data in pages:
             page_num = page_data["page"]
             text = page_data["text"]
@@ -203,62 +278,57 @@ class PDFProcessor:
             if section:
                 current_section = section
 
-            # Split into paragraphs first
-            paragraphs = text.split("\n\n")
-
-            current_chunk = ""
-            chunk_start_page = page_num
+            # Split into non-empty paragraphs first
+            paragraphs = [para for para in map(str.strip, text.split("\n\n")) if para]
 
             for para in paragraphs:
-                para = para.strip()
-                if not para:
-                    continue
+                if not buffer:
+                    buffer = [para]
+                    buffer_len = len(para)
+                    chunk_start_page = page_num
 
                 # Check if adding this paragraph exceeds chunk size
-                if len(current_chunk) + len(para) + 2 > self.chunk_size:
-                    # Save current chunk if it has content
-                    if current_chunk.strip():
-                        chunk = self._create_chunk(
-                            content=current_chunk,
-                            filename=filename,
-                            page=chunk_start_page,
-                            section=current_section,
-                        )
-                        chunks.append(chunk)
+                elif buffer_len + len(para) + 2 > chunk_size:
+                    # Save current chunk
+                    content = "\n\n".join(buffer)
+                    yield self._create_chunk(
+                        content=content,
+                        filename=filename,
+                        page=chunk_start_page,
+                        section=current_section,
+                    )
 
                     # Start new chunk with overlap
-                    if len(current_chunk) > self.chunk_overlap:
-                        # Take last part of previous chunk for overlap
-                        overlap_text = current_chunk[-self.chunk_overlap :]
-                        # Find sentence boundary for cleaner overlap
-                        sentence_end = overlap_text.find(". ")
-                        if sentence_end > 0:
-                            overlap_text = overlap_text[sentence_end + 2 :]
-                        current_chunk = overlap_text + "\n\n" + para
+                    if buffer_len > chunk_overlap:
+                        # Take last part of previous chunk for overlap, starting
+                        # after a sentence boundary for cleaner overlap
+                        overlap_start = len(content) - chunk_overlap
+                        sentence_end = content.find(". ", overlap_start)
+                        if sentence_end > overlap_start:
+                            overlap_start = sentence_end + 2
+                        overlap_text = content[overlap_start:]
+                        buffer = [overlap_text, para]
+                        buffer_len = len(overlap_text) + 2 + len(para)
                     else:
-                        current_chunk = para
+                        buffer = [para]
+                        buffer_len = len(para)
 
                     chunk_start_page = page_num
                 else:
-                    if current_chunk:
-                        current_chunk += "\n\n" + para
-                    else:
-                        current_chunk = para
+                    buffer.append(para)
+                    buffer_len += 2 + len(para)
 
-            # Don't forget the last chunk on this page
-            # It will be continued on next page or saved at the end
+            # The last chunk on this page is continued on the next page
+            # or saved at the end
 
         # Save final chunk
-        if current_chunk.strip():
-            chunk = self._create_chunk(
-                content=current_chunk,
+        if buffer:
+            yield self._create_chunk(
+                content="\n\n".join(buffer),
                 filename=filename,
                 page=chunk_start_page,
                 section=current_section,
             )
-            chunks.append(chunk)
-
-        return chunks
 
     def _create_chunk(
         self,
@@ -269,7 +339,7 @@ class PDFProcessor:
     ) -> dict:
         """Create a document chunk with metadata."""
         # Generate unique ID based on content
-        content_hash = hashlib.md5(content.encode()).hexdigest()[:8]
+        content_hash = short_hash(content)
         doc_id = f"pdf_{filename}_{page}_{content_hash}"
 
         return {
@@ -278,7 +348,7 @@ class PDFProcessor:
             "metadata": {
                 "source_type": "pdf",
                 "source_file": filename,
-                "title": filename.replace(".pdf", "").replace("-", " ").replace("_", " "),
+                "title": _document_title(filename),
                 "page": page,
                 "section": section,
             },
@@ -303,8 +373,48 @@ class PDFProcessor:
         pdf_files = list(directory.glob("*.pdf")) + list(directory.glob("*.PDF"))
         logger.info(f"Found {len(pdf_files)} PDF files in {directory}")
 
-        for pdf_path in pdf_files:
-            chunks = self.process(pdf_path)
-            all_chunks.extend(chunks)
+        return self.process_files(pdf_files)
+
+    def process_files(self, pdf_paths: list[Path]) -> list[dict]:
+        """
+        Process several PDF files, in parallel processes if there is more than one.
+
+        Args:
+            pdf_paths: Paths to the PDF files.
 
-        return all_chunks
+        Returns:
+            Combined list of document chunks, in the order of the files.
+        """
+        # Unchanged files are taken from the cache without starting workers
+        results = {}
+        if self.cache:
+            for pdf_path in pdf_paths:
+                chunks = self.cache.load(pdf_path, self._cache_variant)
+                if chunks is not None:
+                    results[pdf_path] = chunks
+        pending = [pdf_path for pdf_path in pdf_paths if pdf_path not in results]
+
+        if len(pending) <= 1:
+            for pdf_path in pending:
+                results[pdf_path] = self.process(pdf_path)
+        else:
+            workers = min(len(pending), os.cpu_count() or 1)
+            settings = (self.chunk_size, self.chunk_overlap, self.cache)
+            # Spawned, as this runs in a worker thread of the API process
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                chunks_per_file = executor.map(_process_pdf, [settings] * len(pending), pending)
+                for pdf_path, chunks in zip(pending, chunks_per_file):
+                    results[pdf_path] = chunks
+
+        return [chunk for pdf_path in pdf_paths for chunk in results[pdf_path]]
+
+
+def _process_pdf(
+    settings: tuple[int, int, Optional[IngestionCache]], pdf_path: Path
+) -> list[dict]:
+    """Process one PDF in a worker process."""
+    chunk_size, chunk_overlap, cache = settings
+    return PDFProcessor(chunk_size, chunk_overlap, cache).process(pdf_path)
@@ -2,20 +2,105 @@
 XSD processor for converting schema definitions to searchable text documents.
 """
 
-import hashlib
+import heapq
 import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
 from lxml import etree
 
 logger = logging.getLogger(__name__)
 
+# XML Schema namespace, as it appears in lxml's qualified tag names
+XS_NS = "{http://www.w3.org/2001/XMLSchema}"
+
+# Qualified tags of the top-level schema definitions that are read
+SIMPLE_TYPE = f"{XS_NS}simpleType"
+COMPLEX_TYPE = f"{XS_NS}complexType"
+GROUP = f"{XS_NS}group"
+
+# Qualified tags of the nested elements that are read
+RESTRICTION = f"{XS_NS}restriction"
+ENUMERATION = f"{XS_NS}enumeration"
+SEQUENCE = f"{XS_NS}sequence"
+ELEMENT = f"{XS_NS}element"
+
+# Labels of the format restrictions, by qualified facet tag
+CONSTRAINT_LABELS = {
+    f"{XS_NS}minLength": "minimale lengte",
+    f"{XS_NS}maxLength": "maximale lengte",
+    f"{XS_NS}length": "exacte lengte",
+    f"{XS_NS}pattern": "patroon",
+    f"{XS_NS}totalDigits": "totaal cijfers",
+    f"{XS_NS}fractionDigits": "decimalen",
+}
+
+# Reference types of attribute bases, by namespace prefix
+REFERENCE_TYPES = {
+    "cl": "codelijst",
+    "fm": "formaat",
+}
+
+# Human-readable descriptions of entity codes
+ENTITY_DESCRIPTIONS = {
+    "VP": "Verzekeringspolis",
+    "PP": "Premiepenning / Premie",
+    "CA": "Clausules en Aanvullende dekkingen",
+    "AH": "Aanvullende dekkingen Hierarchisch",
+    "PV": "Polisvorm / Voertuig gegevens",
+    "DA": "Dekking Attributen",
+    "BO": "Branche Object",
+    "AN": "Adres Nummeringen",
+    "DR": "Dekking Rechtsbijstand",
+    "XD": "eXtra Data",
+    "VZ": "Verzekerde",
+    "VN": "Verzekeringnemer",
+}
+
+
+def _iter_definitions(filepath: Path, tag: str) -> Iterator[etree._Element]:
+    """
+    Stream the top-level definitions with the given tag from a schema.
+
+    Each definition is complete when yielded and is cleared afterwards,
+    together with everything before it, so only one definition is held in
+    memory at a time.
+
+    Args:
+        filepath: Path to the XSD file.
+        tag: Qualified tag of the definitions to yield.
+
+    Yields:
+        Top-level elements with the given tag, in document order.
+    """
+    for _, elem in etree.iterparse(str(filepath), events=("end",), tag=tag):
+        parent = elem.getparent()
+        # Nested definitions are part of an enclosing element
+        if parent is None or parent.getparent() is not None:
+            continue
+
+        yield elem
+
+        elem.clear()
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def _child(elem: etree._Element, tag: str) -> Optional[etree._Element]:
+    """
+    Get the first child element with the given tag.
+
+    Faster than elem.find(tag), which goes through lxml's path parser.
+    """
+    return next(elem.iterchildren(tag), None)
+
 
 class XSDProcessor:
     """Processor for converting XSD schemas to searchable documents."""
 
-    XS_NS = "{http://www.w3.org/2001/XMLSchema}"
+    XS_NS = XS_NS
 
     def __init__(self, sivi_dir: Path):
         """
@@ -44,30 +129,44 @@ class XSDProcessor:
             ("dekkingcodesgroup.xsd", self._process_dekkingcodes),
         ]
 
+        present = []
         for filename, processor in xsd_files:
             filepath = self.sivi_dir / filename
             if filepath.exists():
-                logger.info(f"Processing XSD: {filename}")
-                docs = processor(filepath)
-                all_docs.extend(docs)
-                logger.info(f"Created {len(docs)} documents from {filename}")
+                present.append((filepath, processor))
             else:
                 logger.warning(f"XSD file not found: {filepath}")
 
+        if not present:
+            return all_docs
+
+        # The files are independent and lxml parses without holding the GIL,
+        # so they are processed concurrently; results keep the file order
+        with ThreadPoolExecutor(max_workers=len(present)) as executor:
+            for docs in executor.map(self._process_file, present):
+                all_docs.extend(docs)
+
         return all_docs
 
+    @staticmethod
+    def _process_file(item: tuple[Path, Callable[[Path], list[dict]]]) -> list[dict]:
+        """Run a file's processor and log the result."""
+        filepath, processor = item
+        logger.info(f"Processing XSD: {filepath.name}")
+        docs = processor(filepath)
+        logger.info(f"Created {len(docs)} documents from {filepath.name}")
+        return docs
+
     def _process_formaten(self, filepath: Path) -> list[dict]:
         """Process formaten.xsd - format specifications."""
         docs = []
-        tree = etree.parse(str(filepath))
-        root = tree.getroot()
 
-        for simple_type in root.findall(f"{self.XS_NS}simpleType"):
+        for simple_type in _iter_definitions(filepath, SIMPLE_TYPE):
             name = simple_type.get("name")
             if not name:
                 continue
 
-            restriction = simple_type.find(f"{self.XS_NS}restriction")
+            restriction = _child(simple_type, RESTRICTION)
             if restriction is None:
                 continue
 
@@ -76,27 +175,19 @@ class XSDProcessor:
             # Build description
             constraints = []
             for child in restriction:
-                tag = child.tag.replace(self.XS_NS, "")
+                label = CONSTRAINT_LABELS.get(child.tag)
+                if label is None:
+                    continue
                 value = child.get("value")
                 if value:
-                    if tag == "minLength":
-                        constraints.append(f"minimale lengte: {value}")
-                    elif tag == "maxLength":
-                        constraints.append(f"maximale lengte: {value}")
-                    elif tag == "length":
-                        constraints.append(f"exacte lengte: {value}")
-                    elif tag == "pattern":
-                        constraints.append(f"patroon: {value}")
-                    elif tag == "totalDigits":
-                        constraints.append(f"totaal cijfers: {value}")
-                    elif tag == "fractionDigits":
-                        constraints.append(f"decimalen: {value}")
-
-            content = f"Format: {name}\nBasistype: {base}\n"
+                    constraints.append(f"{label}: {value}")
+
+            parts = [f"Format: {name}\nBasistype: {base}\n"]
             if constraints:
-                content += "Restricties: " + ", ".join(constraints)
+                parts += ("Restricties: ", ", ".join(constraints))
+            content = "".join(parts)
 
-            doc_id = f"xsd_format_{hashlib.md5(name.encode()).hexdigest()[:8]}"
+            doc_id = f"xsd_format_{name}"
             docs.append({
                 "id": doc_id,
                 "content": content,
@@ -114,20 +205,18 @@ class XSDProcessor:
     def _process_codelist(self, filepath: Path) -> list[dict]:
         """Process codelist.xsd - code enumerations."""
         docs = []
-        tree = etree.parse(str(filepath))
-        root = tree.getroot()
 
-        for simple_type in root.findall(f"{self.XS_NS}simpleType"):
+        for simple_type in _iter_definitions(filepath, SIMPLE_TYPE):
             name = simple_type.get("name")
             if not name:
                 continue
 
-            restriction = simple_type.find(f"{self.XS_NS}restriction")
+            restriction = _child(simple_type, RESTRICTION)
             if restriction is None:
                 continue
 
             values = []
-            for enum in restriction.findall(f"{self.XS_NS}enumeration"):
+            for enum in restriction.iterchildren(ENUMERATION):
                 value = enum.get("value")
                 if value:
                     values.append(value)
@@ -136,13 +225,17 @@ class XSDProcessor:
                 continue
 
             # Create document with code list
-            content = f"Codelijst: {name}\n"
-            content += f"Aantal geldige codes: {len(values)}\n"
-            content += "Geldige waarden: " + ", ".join(sorted(values)[:50])
+            parts = [
+                f"Codelijst: {name}\n",
+                f"Aantal geldige codes: {len(values)}\n",
+                "Geldige waarden: ",
+                ", ".join(heapq.nsmallest(50, values)),
+            ]
             if len(values) > 50:
-                content += f"... (en {len(values) - 50} meer)"
+                parts.append(f"... (en {len(values) - 50} meer)")
+            content = "".join(parts)
 
-            doc_id = f"xsd_codelist_{hashlib.md5(name.encode()).hexdigest()[:8]}"
+            doc_id = f"xsd_codelist_{name}"
             docs.append({
                 "id": doc_id,
                 "content": content,
@@ -161,47 +254,42 @@ class XSDProcessor:
     def _process_attributen(self, filepath: Path) -> list[dict]:
         """Process attributen.xsd - attribute definitions."""
         docs = []
-        tree = etree.parse(str(filepath))
-        root = tree.getroot()
 
         # Group attributes by their base/format reference
-        attr_groups = {}
+        attr_groups: defaultdict[str, list[str]] = defaultdict(list)
 
-        for simple_type in root.findall(f"{self.XS_NS}simpleType"):
+        for simple_type in _iter_definitions(filepath, SIMPLE_TYPE):
             name = simple_type.get("name")
             if not name:
                 continue
 
-            restriction = simple_type.find(f"{self.XS_NS}restriction")
+            restriction = _child(simple_type, RESTRICTION)
             if restriction is None:
                 continue
 
-            base = restriction.get("base", "")
-
-            if base not in attr_groups:
-                attr_groups[base] = []
-            attr_groups[base].append(name)
+            attr_groups[restriction.get("base", "")].append(name)
 
         # Create documents for attribute groups
         for base, attrs in attr_groups.items():
             # Determine if it's a format or codelist reference
-            if base.startswith("cl:"):
-                ref_type = "codelijst"
-                ref_name = base[3:]
-            elif base.startswith("fm:"):
-                ref_type = "formaat"
-                ref_name = base[3:]
+            prefix, sep, rest = base.partition(":")
+            ref_type = REFERENCE_TYPES.get(prefix) if sep else None
+            if ref_type is not None:
+                ref_name = rest
             else:
                 ref_type = "type"
                 ref_name = base
 
-            content = f"Attributen met {ref_type} '{ref_name}':\n"
-            content += ", ".join(sorted(attrs)[:30])
+            parts = [
+                f"Attributen met {ref_type} '{ref_name}':\n",
+                ", ".join(heapq.nsmallest(30, attrs)),
+            ]
             if len(attrs) > 30:
-                content += f"... (en {len(attrs) - 30} meer)"
-            content += f"\n\nTotaal: {len(attrs)} attributen gebruiken dit {ref_type}."
+                parts.append(f"... (en {len(attrs) - 30} meer)")
+            parts.append(f"\n\nTotaal: {len(attrs)} attributen gebruiken dit {ref_type}.")
+            content = "".join(parts)
 
-            doc_id = f"xsd_attrs_{hashlib.md5(base.encode()).hexdigest()[:8]}"
+            doc_id = f"xsd_attrs_{base}"
             docs.append({
                 "id": doc_id,
                 "content": content,
@@ -220,24 +308,23 @@ class XSDProcessor:
     def _process_entiteiten(self, filepath: Path) -> list[dict]:
         """Process entiteiten.xsd - entity definitions."""
         docs = []
-        tree = etree.parse(str(filepath))
-        root = tree.getroot()
 
-        for complex_type in root.findall(f"{self.XS_NS}complexType"):
+        for complex_type in _iter_definitions(filepath, COMPLEX_TYPE):
             name = complex_type.get("name")
             if not name or len(name) != 2:
                 continue
 
             # Collect attributes
             attributes = []
-            sequence = complex_type.find(f"{self.XS_NS}sequence")
+            sequence = _child(complex_type, SEQUENCE)
             if sequence is not None:
                 for child in sequence:
-                    if child.tag == f"{self.XS_NS}element":
+                    tag = child.tag
+                    if tag == ELEMENT:
                         elem_name = child.get("name")
                         if elem_name:
                             attributes.append(elem_name)
-                    elif child.tag == f"{self.XS_NS}group":
+                    elif tag == GROUP:
                         ref = child.get("ref", "")
                         if "_CODEGroup" in ref:
                             group_name = ref.split(":")[-1] if ":" in ref else ref
@@ -249,10 +336,12 @@ class XSDProcessor:
 
             # Create human-readable description
             entity_desc = self._get_entity_description(name)
-            content = f"Entiteit: {name} ({entity_desc})\n\n"
-            content += f"Geldige attributen voor entiteit {name}:\n"
-            content += ", ".join(sorted(attributes))
-            content += f"\n\nTotaal: {len(attributes)} attributen."
+            content = "".join((
+                f"Entiteit: {name} ({entity_desc})\n\n",
+                f"Geldige attributen voor entiteit {name}:\n",
+                ", ".join(sorted(attributes)),
+                f"\n\nTotaal: {len(attributes)} attributen.",
+            ))
 
             doc_id = f"xsd_entity_{name}"
             docs.append({
@@ -273,38 +362,33 @@ class XSDProcessor:
     def _process_dekkingcodes(self, filepath: Path) -> list[dict]:
         """Process dekkingcodesgroup.xsd - coverage codes per entity."""
         docs = []
-        tree = etree.parse(str(filepath))
-        root = tree.getroot()
 
-        for group in root.findall(f"{self.XS_NS}group"):
+        for group in _iter_definitions(filepath, GROUP):
             name = group.get("name")
             if not name or not name.endswith("_CODEGroup"):
                 continue
 
             entity_code = name.replace("_CODEGroup", "")
 
-            # Collect coverage codes
-            codes = []
-            for element in group.iter(f"{self.XS_NS}element"):
-                simple_type = element.find(f"{self.XS_NS}simpleType")
-                if simple_type is not None:
-                    restriction = simple_type.find(f"{self.XS_NS}restriction")
-                    if restriction is not None:
-                        for enum in restriction.findall(f"{self.XS_NS}enumeration"):
-                            value = enum.get("value")
-                            if value:
-                                codes.append(value)
+            # Collect coverage codes; a code group only has enumerations in
+            # the restrictions of its elements, so one tag-filtered walk
+            # finds them all
+            codes = [
+                value for enum in group.iter(ENUMERATION) if (value := enum.get("value"))
+            ]
 
             if not codes:
                 continue
 
             entity_desc = self._get_entity_description(entity_code)
-            content = f"Dekkingscodes voor entiteit {entity_code} ({entity_desc}):\n\n"
-            content += f"Geldige {entity_code}_CODE waarden:\n"
-            content += ", ".join(sorted(codes))
-            content += f"\n\nTotaal: {len(codes)} geldige codes voor {entity_code}."
-            content += f"\n\nLET OP: Deze codes zijn ALLEEN geldig voor entiteit {entity_code}. "
-            content += f"Gebruik deze codes niet voor andere entiteiten."
+            content = "".join((
+                f"Dekkingscodes voor entiteit {entity_code} ({entity_desc}):\n\n",
+                f"Geldige {entity_code}_CODE waarden:\n",
+                ", ".join(sorted(codes)),
+                f"\n\nTotaal: {len(codes)} geldige codes voor {entity_code}.",
+                f"\n\nLET OP: Deze codes zijn ALLEEN geldig voor entiteit {entity_code}. ",
+                "Gebruik deze codes niet voor andere entiteiten.",
+            ))
 
             doc_id = f"xsd_coverage_{entity_code}"
             docs.append({
@@ -324,18 +408,4 @@ class XSDProcessor:
 
     def _get_entity_description(self, code: str) -> str:
         """Get human-readable description for entity codes."""
-        descriptions = {
-            "VP": "Verzekeringspolis",
-            "PP": "Premiepenning / Premie",
-            "CA": "Clausules en Aanvullende dekkingen",
-            "AH": "Aanvullende dekkingen Hierarchisch",
-            "PV": "Polisvorm / Voertuig gegevens",
-            "DA": "Dekking Attributen",
-            "BO": "Branche Object",
-            "AN": "Adres Nummeringen",
-            "DR": "Dekking Rechtsbijstand",
-            "XD": "eXtra Data",
-            "VZ": "Verzekerde",
-            "VN": "Verzekeringnemer",
-        }
-        return descriptions.get(code, "Onbekende entiteit")
+        return ENTITY_DESCRIPTIONS.get(code, "Onbekende entiteit")
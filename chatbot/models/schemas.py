@@ -4,7 +4,7 @@ Pydantic models for the RAG chatbot API.
 
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class FindingContext(BaseModel):
@@ -22,6 +22,22 @@ class FindingContext(BaseModel):
     verwacht: Optional[str] = Field(None, description="Expected value/format")
     bron: Optional[str] = Field(None, description="Source reference")
 
+    def as_ctx_tuple(self) -> tuple[str, ...]:
+        """
+        Return the fields shown in a prompt, with placeholders for missing values.
+
+        Order: code, severity, entiteit, label, waarde, omschrijving, verwacht.
+        """
+        return (
+            self.code or "Onbekend",
+            self.severity or "Onbekend",
+            self.entiteit or "Onbekend",
+            self.label or "-",
+            self.waarde or "-",
+            self.omschrijving or "-",
+            self.verwacht or "-",
+        )
+
 
 class Source(BaseModel):
     """A source reference for an answer."""
@@ -50,6 +66,9 @@ class ChatRequest(BaseModel):
     validation_file: Optional[str] = Field(
         None, description="Name of the validated file"
     )
+    want_suggestions: bool = Field(
+        True, description="Whether to generate follow-up question suggestions"
+    )
 
 
 class ChatResponse(BaseModel):
@@ -86,13 +105,12 @@ class KnowledgeStatus(BaseModel):
 
 class Document(BaseModel):
     """A document chunk for the vector store."""
+    model_config = ConfigDict(extra="allow")
+
     id: str = Field(..., description="Unique document ID")
     content: str = Field(..., description="Document text content")
     metadata: dict = Field(default_factory=dict, description="Document metadata")
 
-    class Config:
-        extra = "allow"
-
 
 class ConversationHistory(BaseModel):
     """Full conversation history."""
@@ -3,15 +3,25 @@ Embedding model wrapper using sentence-transformers.
 """
 
 import logging
+import threading
+from functools import lru_cache
 from typing import Optional
 
 import numpy as np
+from cachetools import LRUCache
 
 logger = logging.getLogger(__name__)
 
 # Model name for multilingual embeddings (supports Dutch)
 DEFAULT_MODEL = "paraphrase-multilingual-mpnet-base-v2"
 
+# Texts per forward pass; a GPU needs larger batches to stay busy
+CPU_BATCH_SIZE = 32
+GPU_BATCH_SIZE = 128
+
+# Number of query embeddings kept in memory
+QUERY_CACHE_SIZE = 2048
+
 
 class EmbeddingModel:
     """Wrapper for sentence-transformers embedding model."""
@@ -25,16 +35,33 @@ class EmbeddingModel:
         """
         self.model_name = model_name
         self._model = None
+        self._batch_size = CPU_BATCH_SIZE
+        self._load_lock = threading.Lock()
+        self._query_cache: LRUCache = LRUCache(maxsize=QUERY_CACHE_SIZE)
+        self._query_cache_lock = threading.Lock()
 
     @property
     def model(self):
         """Lazy-load the model on first use."""
-        if self._model is None:
+        if self._model is not None:
+            return self._model
+
+        # A warm-up thread and a request may both ask for the model
+        with self._load_lock:
+            if self._model is not None:
+                return self._model
+
             logger.info(f"Loading embedding model: {self.model_name}")
             try:
                 from sentence_transformers import SentenceTransformer
-                self._model = SentenceTransformer(self.model_name)
-                logger.info(f"Embedding model loaded successfully")
+                model = SentenceTransformer(self.model_name)
+                if model.device.type == "cuda":
+                    # Half precision halves memory traffic on the GPU
+                    model.half()
+                    self._batch_size = GPU_BATCH_SIZE
+                logger.info(f"Embedding model loaded on {model.device}")
+                # Only publish the model once it is ready for use
+                self._model = model
             except ImportError:
                 raise ImportError(
                     "sentence-transformers is required. "
@@ -48,7 +75,16 @@ class EmbeddingModel:
         # paraphrase-multilingual-mpnet-base-v2 has 768 dimensions
         return 768
 
-    def embed_text(self, text: str) -> list[float]:
+    def warmup(self) -> None:
+        """
+        Load the model and run one encode.
+
+        The first encode initializes the thread pools and device kernels, so
+        doing this ahead of time keeps that delay away from the first query.
+        """
+        self.model.encode(["warmup"], batch_size=1, convert_to_numpy=True)
+
+    def embed_text(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text.
 
@@ -56,12 +92,11 @@ class EmbeddingModel:
             text: Text to embed.
 
         Returns:
-            List of floats representing the embedding vector.
+            The embedding vector.
         """
-        embedding = self.model.encode(text, convert_to_numpy=True)
-        return embedding.tolist()
+        return self.model.encode(text, convert_to_numpy=True)
 
-    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
         """
         Generate embeddings for multiple texts.
 
@@ -69,29 +104,89 @@ class EmbeddingModel:
             texts: List of texts to embed.
 
         Returns:
-            List of embedding vectors.
+            Array with one embedding vector per row.
         """
         if not texts:
-            return []
+            return np.empty((0, self.dimension), dtype=np.float32)
 
         logger.debug(f"Embedding {len(texts)} texts")
-        embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-        return embeddings.tolist()
-
-    def embed_query(self, query: str) -> list[float]:
+        return self.model.encode(
+            texts,
+            batch_size=self._batch_size,
+            convert_to_numpy=True,
+            # Only ingestion embeds more than one batch; retrieval queries
+            # would otherwise print a bar for every request
+            show_progress_bar=len(texts) > self._batch_size,
+        )
+
+    def embed_query(self, query: str) -> np.ndarray:
         """
         Generate embedding for a search query.
 
-        This is the same as embed_text but named separately for clarity
-        in retrieval context.
+        This is the same as embed_text, but results are cached: the same
+        questions are asked repeatedly.
 
         Args:
             query: Query text to embed.
 
         Returns:
-            Embedding vector.
+            Embedding vector (read-only, as it is shared by callers).
+        """
+        with self._query_cache_lock:
+            vector = self._query_cache.get(query)
+        if vector is None:
+            vector = self.embed_text(query)
+            vector.setflags(write=False)
+            with self._query_cache_lock:
+                self._query_cache[query] = vector
+        return vector
+
+    def embed_queries(self, queries: list[str]) -> list[np.ndarray]:
+        """
+        Generate embeddings for several search queries.
+
+        Queries embedded before (by either method) are taken from the query
+        cache; the others are embedded together in one call and cached.
+
+        Args:
+            queries: Query texts to embed.
+
+        Returns:
+            One embedding vector (read-only) per query, in query order.
         """
-        return self.embed_text(query)
+        with self._query_cache_lock:
+            vectors = [self._query_cache.get(query) for query in queries]
+
+        missing = list(dict.fromkeys(q for q, v in zip(queries, vectors) if v is None))
+        if missing:
+            embedded = dict(zip(missing, self.embed_texts(missing)))
+            with self._query_cache_lock:
+                for query, vector in embedded.items():
+                    vector.setflags(write=False)
+                    self._query_cache[query] = vector
+            vectors = [
+                embedded[query] if vector is None else vector
+                for query, vector in zip(queries, vectors)
+            ]
+
+        return vectors
+
+
+@lru_cache(maxsize=None)
+def get_embedding_model(model_name: str = DEFAULT_MODEL) -> EmbeddingModel:
+    """
+    Get the shared embedding model for a model name.
+
+    The model weights are loaded only once per process, however many
+    embedding functions use them.
+
+    Args:
+        model_name: Name of the sentence-transformers model.
+
+    Returns:
+        The shared EmbeddingModel instance.
+    """
+    return EmbeddingModel(model_name)
 
 
 class ChromaEmbeddingFunction:
@@ -106,9 +201,15 @@ class ChromaEmbeddingFunction:
         Initialize the ChromaDB embedding function.
 
         Args:
-            embedding_model: Optional EmbeddingModel instance. Creates one if not provided.
+            embedding_model: Optional EmbeddingModel instance. Uses the shared
+                model if not provided.
         """
-        self._embedding_model = embedding_model or EmbeddingModel()
+        self._embedding_model = embedding_model or get_embedding_model()
+
+    @property
+    def embedding_model(self) -> EmbeddingModel:
+        """The wrapped embedding model, for callers that want arrays."""
+        return self._embedding_model
 
     def __call__(self, input: list[str]) -> list[list[float]]:
         """
@@ -120,4 +221,5 @@ class ChromaEmbeddingFunction:
         Returns:
             List of embedding vectors.
         """
-        return self._embedding_model.embed_texts(input)
+        # ChromaDB 0.4 only accepts embeddings as lists of floats
+        return self._embedding_model.embed_texts(input).tolist()
@@ -2,13 +2,153 @@
 Retrieval logic for finding relevant documents.
 """
 
+import heapq
 import logging
-from typing import Optional
+import threading
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
+from typing import Optional, Sequence
 
+from cachetools import LRUCache
+
+from ..chat.semantic_cache import SemanticCache, identifier_tokens
 from ..models.schemas import FindingContext, Source
 
 logger = logging.getLogger(__name__)
 
+# Minimum relevance score for finding-targeted queries
+FINDING_MIN_SCORE = 0.25
+
+# Number of query results kept in memory
+RESULT_CACHE_SIZE = 1024
+
+# Minimum cosine similarity for a query to reuse the results of an earlier,
+# differently worded one with the same codes and numbers
+SIMILAR_QUERY_THRESHOLD = 0.97
+
+# Every document from the vector store has a score
+_score = itemgetter("score")
+
+# Tokenizer used to budget the context; Claude's own tokenizer is not
+# available, but this is far closer for Dutch text than 4 characters per token
+TOKEN_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tokenizer, or None to fall back to a character estimate."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except ImportError:
+        logger.warning("tiktoken not installed, estimating tokens from characters")
+    except Exception as e:
+        logger.warning(f"Could not load tokenizer, estimating tokens from characters: {e}")
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _count_tokens(text: str) -> int:
+    """Count the tokens in a text; retrieved documents recur, so counts are cached."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text down to at most max_tokens tokens."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[: max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+@lru_cache(maxsize=32)
+def _source_type_filter(source_types: frozenset[str]) -> Optional[dict]:
+    """
+    Build the metadata filter for a set of source types.
+
+    The same few combinations are used for every finding, so the filters
+    are built once; callers must not modify them.
+
+    Returns:
+        Chroma where clause, or None for no filter.
+    """
+    if not source_types:
+        return None
+    if len(source_types) == 1:
+        return {"source_type": next(iter(source_types))}
+    return {"source_type": {"$in": sorted(source_types)}}
+
+
+@lru_cache(maxsize=1024)
+def _finding_queries(
+    code: str,
+    severity: str,
+    omschrijving: Optional[str],
+    entiteit: Optional[str],
+    label: Optional[str],
+    waarde: Optional[str],
+    verwacht: Optional[str],
+    regeltype: Optional[str],
+    branche: Optional[str],
+) -> tuple[tuple[str, Optional[tuple[str, ...]]], ...]:
+    """
+    Build the targeted queries for a finding from its fields.
+
+    Findings of the same rule often share these fields, so the queries
+    are cached.
+
+    Returns:
+        Tuple of (query, source_types) tuples.
+    """
+    queries = []
+
+    # Query 1: Direct description search
+    if omschrijving:
+        queries.append((omschrijving, None))
+
+    # Query 2: Entity-specific query
+    if entiteit:
+        entity_query = f"entiteit {entiteit}"
+        if label:
+            entity_query += f" {label}"
+        if code:
+            entity_query += f" {code}"
+        queries.append((entity_query, ("xsd", "expert")))
+
+    # Query 3: Code-specific query (for coverage codes, branch codes, etc.)
+    if waarde:
+        if entiteit:
+            code_query = f"{entiteit} code {waarde}"
+        else:
+            code_query = f"code {waarde}"
+        if verwacht:
+            code_query += f" {verwacht}"
+        queries.append((code_query, ("xsd", "codelist")))
+
+    # Query 4: Rule type query
+    if regeltype:
+        queries.append((f"regel {regeltype}", ("expert",)))
+
+    # Query 5: Branch-specific query
+    if branche:
+        branch_query = f"branche {branche}"
+        if entiteit:
+            branch_query += f" {entiteit}"
+        queries.append((branch_query, ("codelist", "pdf")))
+
+    # Ensure at least one query
+    if not queries:
+        queries.append((f"{code} {severity}", None))
+
+    return tuple(queries)
+
 
 class Retriever:
     """Retriever for finding relevant documents from the vector store."""
@@ -22,6 +162,50 @@ class Retriever:
         """
         self.vector_store = vector_store
 
+        # Results by (generation, query, source_types, n_results, min_score);
+        # invalidate() bumps the generation so results of queries running
+        # during a rebuild are never served afterwards
+        self._cache: LRUCache = LRUCache(maxsize=RESULT_CACHE_SIZE)
+        # Results by query embedding, for near-duplicate queries; entries
+        # are scoped by (source_types, n_results, min_score, identifiers) so
+        # a query for another code never reuses these results
+        self._similar_cache = SemanticCache(
+            lambda text: self.vector_store.embedding_function.embedding_model.embed_query(text),
+            threshold=SIMILAR_QUERY_THRESHOLD,
+            max_entries=RESULT_CACHE_SIZE,
+        )
+        self._cache_lock = threading.Lock()
+        self._generation = 0
+        self._rule_codes: Optional[frozenset[str]] = None
+
+    def invalidate(self) -> None:
+        """Drop cached results, e.g. after the knowledge base was rebuilt."""
+        with self._cache_lock:
+            self._generation += 1
+            self._cache.clear()
+            self._similar_cache.clear()
+        self._rule_codes = None
+
+    def rule_codes(self) -> frozenset[str]:
+        """
+        Get the finding codes that expert rules in the knowledge base refer to.
+
+        Returns:
+            Set of finding codes (e.g. E1-002).
+        """
+        # None until loaded; an empty set is cached too, so a knowledge base
+        # without expert rules is not queried again for every finding
+        if self._rule_codes is None:
+            codes = set()
+            for meta in self.vector_store.get_metadatas(where={"source_type": "expert"}):
+                for code in meta.get("related_codes", "").split(","):
+                    if code.strip():
+                        codes.add(code.strip())
+
+            self._rule_codes = frozenset(codes)
+
+        return self._rule_codes
+
     def retrieve(
         self,
         query: str,
@@ -41,26 +225,84 @@ class Retriever:
         Returns:
             List of relevant documents with scores.
         """
-        # Build metadata filter if source types specified
-        where = None
-        if source_types:
-            if len(source_types) == 1:
-                where = {"source_type": source_types[0]}
-            else:
-                where = {"source_type": {"$in": source_types}}
+        return self.retrieve_batch([(query, source_types)], [n_results], min_score)[0]
 
-        # Query the vector store
-        results = self.vector_store.query(
-            query_text=query,
-            n_results=n_results,
-            where=where,
-        )
+    def retrieve_batch(
+        self,
+        queries: list[tuple[str, Optional[Sequence[str]]]],
+        n_results: list[int],
+        min_score: float = 0.3,
+    ) -> list[list[dict]]:
+        """
+        Retrieve relevant documents for several queries at once.
+
+        Queries not embedded before are embedded in a single call, and
+        queries sharing a source type filter are sent to the vector store
+        together. Results of earlier identical or near-identical queries are
+        served from memory.
+
+        Args:
+            queries: List of (query, source_types) tuples.
+            n_results: Maximum number of results for each query.
+            min_score: Minimum relevance score (0-1).
 
-        # Filter by minimum score
-        filtered = [r for r in results if r.get("score", 0) >= min_score]
+        Returns:
+            One list of relevant documents per query, in query order.
+        """
+        generation = self._generation
+        keys = [
+            (generation, query, frozenset(source_types or ()), n, min_score)
+            for (query, source_types), n in zip(queries, n_results)
+        ]
+        scopes = [key[2:] + (identifier_tokens(key[1]),) for key in keys]
+
+        with self._cache_lock:
+            results: list[Optional[list[dict]]] = [self._cache.get(key) for key in keys]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if not missing:
+            return [list(r) for r in results]
+
+        # Through the query cache: the user's question was usually embedded
+        # already for the answer cache, and finding queries recur
+        embedding_model = self.vector_store.embedding_function.embedding_model
+        embeddings = embedding_model.embed_queries([queries[i][0] for i in missing])
+
+        # Serve near-duplicates of earlier queries, and group the others by
+        # source type filter
+        groups: dict[frozenset[str], list[tuple]] = {}
+        for i, embedding in zip(missing, embeddings):
+            vector = SemanticCache.normalize(embedding)
+            with self._cache_lock:
+                similar = self._similar_cache.lookup(vector, scopes[i])
+            if similar is not None:
+                results[i] = similar
+            else:
+                groups.setdefault(keys[i][2], []).append((i, embedding, vector))
+
+        for source_types, members in groups.items():
+            # Query the vector store
+            group_results = self.vector_store.query_batch(
+                query_embeddings=[embedding.tolist() for _, embedding, _ in members],
+                n_results=max(n_results[i] for i, _, _ in members),
+                where=_source_type_filter(source_types),
+            )
 
-        logger.debug(f"Retrieved {len(filtered)} documents for query: {query[:50]}...")
-        return filtered
+            # Trim to each query's own limit and filter by minimum score
+            for (i, _, vector), docs in zip(members, group_results):
+                results[i] = [
+                    r for r in docs[: n_results[i]] if r["score"] >= min_score
+                ]
+                # Failed queries come back empty and are not cached
+                if docs:
+                    with self._cache_lock:
+                        self._cache[keys[i]] = results[i]
+                        if generation == self._generation:
+                            self._similar_cache.store(vector, results[i], scopes[i])
+
+        logger.debug(
+            f"Retrieved {sum(map(len, results))} documents for {len(queries)} queries"
+        )
+        return [list(r) for r in results]
 
     def retrieve_for_finding(
         self,
@@ -79,79 +321,75 @@ class Retriever:
         Returns:
             Deduplicated list of relevant documents.
         """
-        all_results = []
-        seen_ids = set()
+        queries, limits = self.plan_finding_queries(finding, n_results)
+        results = self.retrieve_batch(queries, limits, min_score=FINDING_MIN_SCORE)
+        return self.merge_results(results, n_results)
+
+    def plan_finding_queries(
+        self,
+        finding: FindingContext,
+        n_results: int = 8,
+    ) -> tuple[list[tuple[str, Optional[Sequence[str]]]], list[int]]:
+        """
+        Build the queries retrieve_for_finding() sends for a finding.
 
-        # Build queries based on finding context
+        Lets callers batch them together with queries of their own.
+
+        Args:
+            finding: The finding context.
+            n_results: Maximum total results.
+
+        Returns:
+            Tuple of (queries, n_results per query) for retrieve_batch().
+        """
         queries = self._build_finding_queries(finding)
+        return queries, [n_results // len(queries) + 1] * len(queries)
 
-        for query, source_filter in queries:
-            results = self.retrieve(
-                query=query,
-                n_results=n_results // len(queries) + 1,
-                source_types=source_filter,
-                min_score=0.25,
-            )
+    def merge_results(
+        self,
+        result_lists: list[list[dict]],
+        n_results: int,
+    ) -> list[dict]:
+        """
+        Merge per-query results into one deduplicated list.
+
+        A document found by several queries keeps its highest score.
+
+        Args:
+            result_lists: Lists of retrieved documents.
+            n_results: Maximum number of documents to keep.
 
-            for doc in results:
-                if doc["id"] not in seen_ids:
-                    seen_ids.add(doc["id"])
-                    all_results.append(doc)
+        Returns:
+            Deduplicated documents sorted by score.
+        """
+        merged: dict[str, dict] = {}
+        for doc in chain.from_iterable(result_lists):
+            current = merged.get(doc["id"])
+            if current is None or doc["score"] > current["score"]:
+                merged[doc["id"]] = doc
 
-        # Sort by score and limit
-        all_results.sort(key=lambda x: x.get("score", 0), reverse=True)
-        return all_results[:n_results]
+        return heapq.nlargest(n_results, merged.values(), key=_score)
 
     def _build_finding_queries(
         self,
         finding: FindingContext,
-    ) -> list[tuple[str, Optional[list[str]]]]:
+    ) -> list[tuple[str, Optional[tuple[str, ...]]]]:
         """
         Build targeted queries based on finding context.
 
         Returns list of (query, source_types) tuples.
         """
-        queries = []
-
-        # Query 1: Direct description search
-        if finding.omschrijving:
-            queries.append((finding.omschrijving, None))
-
-        # Query 2: Entity-specific query
-        if finding.entiteit:
-            entity_query = f"entiteit {finding.entiteit}"
-            if finding.label:
-                entity_query += f" {finding.label}"
-            if finding.code:
-                entity_query += f" {finding.code}"
-            queries.append((entity_query, ["xsd", "expert"]))
-
-        # Query 3: Code-specific query (for coverage codes, branch codes, etc.)
-        if finding.waarde:
-            if finding.entiteit:
-                code_query = f"{finding.entiteit} code {finding.waarde}"
-            else:
-                code_query = f"code {finding.waarde}"
-            if finding.verwacht:
-                code_query += f" {finding.verwacht}"
-            queries.append((code_query, ["xsd", "codelist"]))
-
-        # Query 4: Rule type query
-        if finding.regeltype:
-            queries.append((f"regel {finding.regeltype}", ["expert"]))
-
-        # Query 5: Branch-specific query
-        if finding.branche:
-            branch_query = f"branche {finding.branche}"
-            if finding.entiteit:
-                branch_query += f" {finding.entiteit}"
-            queries.append((branch_query, ["codelist", "pdf"]))
-
-        # Ensure at least one query
-        if not queries:
-            queries.append((f"{finding.code} {finding.severity}", None))
-
-        return queries
+        return list(_finding_queries(
+            finding.code,
+            finding.severity,
+            finding.omschrijving,
+            finding.entiteit,
+            finding.label,
+            finding.waarde,
+            finding.verwacht,
+            finding.regeltype,
+            finding.branche,
+        ))
 
     def build_sources(self, documents: list[dict]) -> list[Source]:
         """
@@ -188,7 +426,7 @@ class Retriever:
 
         Args:
             documents: List of retrieved documents.
-            max_tokens: Approximate max tokens for context.
+            max_tokens: Max tokens for context.
 
         Returns:
             Formatted context string.
@@ -214,21 +452,22 @@ class Retriever:
                 header += f", pagina {meta['page']}"
             header += f" ({source_type})]"
 
-            part = f"{header}\n{content}\n"
-
-            # Rough token estimation (4 chars per token)
-            part_tokens = len(part) // 4
+            # Count before the part is assembled so an oversized document
+            # is only copied once
+            header_tokens = _count_tokens(header)
+            part_tokens = header_tokens + _count_tokens(content) + 1
 
             if estimated_tokens + part_tokens > max_tokens:
                 # Truncate content if needed
-                remaining_chars = (max_tokens - estimated_tokens) * 4
-                if remaining_chars > 200:
-                    truncated_content = content[: remaining_chars - len(header) - 50] + "..."
-                    part = f"{header}\n{truncated_content}\n"
-                    context_parts.append(part)
+                remaining_tokens = max_tokens - estimated_tokens
+                if remaining_tokens > 50:
+                    truncated_content = _truncate_tokens(
+                        content, remaining_tokens - header_tokens - 12
+                    )
+                    context_parts.append(f"{header}\n{truncated_content}...\n")
                 break
 
-            context_parts.append(part)
+            context_parts.append(f"{header}\n{content}\n")
             estimated_tokens += part_tokens
 
         return "\n".join(context_parts)
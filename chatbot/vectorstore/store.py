@@ -3,15 +3,71 @@ ChromaDB vector store wrapper for document storage and retrieval.
 """
 
 import logging
+import os
+import sqlite3
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
+
+import orjson
 
 logger = logging.getLogger(__name__)
 
 # Collection name for SIVI knowledge base
 COLLECTION_NAME = "sivi_knowledge"
 
+# Documents per Chroma add call: large enough to amortize index updates,
+# small enough to keep memory bounded (and below Chroma's max batch size)
+ADD_BATCH_SIZE = 2000
+
+# SQLite database file of a persistent ChromaDB client
+CHROMA_DB_FILE = "chroma.sqlite3"
+
+# Sidecar file with the number of documents per source type
+TYPE_COUNTS_FILE = "type_counts.json"
+
+
+# Metadata value types ChromaDB stores as they are; checked by exact type
+# first, as nearly all values are plain instances
+PRIMITIVE_TYPES = frozenset({str, int, float, bool})
+
+
+def _clean_metadata_value(value):
+    """Convert a metadata value that is not of a primitive type for ChromaDB."""
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _enable_wal(db_path: Path) -> None:
+    """
+    Switch a SQLite database to write-ahead logging.
+
+    The journal mode is stored in the database file, so it also applies to
+    the connections ChromaDB opens later. In WAL mode a commit appends to
+    the log instead of rewriting pages, which makes the many small
+    transactions of a knowledge base rebuild cheaper, and readers no longer
+    block the writer.
+
+    Args:
+        db_path: Path to the database file; it is created if missing.
+    """
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        finally:
+            conn.close()
+        if mode != "wal":
+            logger.warning(f"Could not enable WAL for {db_path.name}, journal mode is {mode}")
+    except sqlite3.Error as e:
+        logger.warning(f"Could not enable WAL for {db_path.name}: {e}")
+
 
 class VectorStore:
     """ChromaDB-based vector store for SIVI documentation."""
@@ -34,6 +90,9 @@ class VectorStore:
         self._collection = None
         self._embedding_function = None
         self._last_rebuild: Optional[datetime] = None
+        # Documents per source type, kept up to date by add_documents and
+        # delete_all so get_stats does not have to read every document
+        self._type_counts: Optional[Counter] = None
 
     @property
     def client(self):
@@ -45,6 +104,7 @@ class VectorStore:
 
                 if self.persist_directory:
                     self.persist_directory.mkdir(parents=True, exist_ok=True)
+                    _enable_wal(self.persist_directory / CHROMA_DB_FILE)
                     logger.info(f"Initializing persistent ChromaDB at {self.persist_directory}")
                     self._client = chromadb.PersistentClient(
                         path=str(self.persist_directory),
@@ -81,61 +141,105 @@ class VectorStore:
             logger.info(f"Collection '{self.collection_name}' ready with {self._collection.count()} documents")
         return self._collection
 
+    def warmup(self) -> None:
+        """
+        Load the embedding model and the collection ahead of the first query.
+
+        ChromaDB reads a collection's vector index from disk on the first
+        query, so a single-result query is run to load it.
+        """
+        embedding_model = self.embedding_function.embedding_model
+        embedding_model.warmup()
+
+        if self.collection.count() > 0:
+            self.collection.query(
+                query_embeddings=[embedding_model.embed_text("warmup").tolist()],
+                n_results=1,
+                include=["distances"],
+            )
+
     def add_documents(
         self,
-        documents: list[dict],
-        batch_size: int = 100,
+        documents: Iterable[dict],
+        batch_size: int = ADD_BATCH_SIZE,
     ) -> int:
         """
         Add documents to the vector store.
 
+        Documents are consumed one batch at a time, so a generator is never
+        materialized in full. Each batch is embedded in a worker thread
+        while the previous batch is written, so the model and the database
+        work at the same time.
+
         Args:
-            documents: List of dicts with 'id', 'content', and 'metadata' keys.
+            documents: Dicts with 'id', 'content', and 'metadata' keys.
             batch_size: Number of documents to add per batch.
 
         Returns:
             Number of documents added.
         """
-        if not documents:
-            return 0
-
         total_added = 0
+        documents = iter(documents)
+        if self._type_counts is None:
+            self._type_counts = self._load_type_counts()
 
-        for i in range(0, len(documents), batch_size):
-            batch = documents[i : i + batch_size]
-
-            ids = [doc["id"] for doc in batch]
-            contents = [doc["content"] for doc in batch]
-            metadatas = [doc.get("metadata", {}) for doc in batch]
-
-            # Ensure all metadata values are primitive types
-            cleaned_metadatas = []
-            for meta in metadatas:
-                cleaned = {}
-                for k, v in meta.items():
-                    if isinstance(v, (str, int, float, bool)):
-                        cleaned[k] = v
-                    elif v is None:
-                        cleaned[k] = ""
-                    else:
-                        cleaned[k] = str(v)
-                cleaned_metadatas.append(cleaned)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = None
 
-            try:
-                self.collection.add(
-                    ids=ids,
-                    documents=contents,
-                    metadatas=cleaned_metadatas,
-                )
-                total_added += len(batch)
-                logger.debug(f"Added batch of {len(batch)} documents ({total_added} total)")
-            except Exception as e:
-                logger.error(f"Error adding batch: {e}")
-                raise
+            while batch := list(islice(documents, batch_size)):
+                contents = [doc["content"] for doc in batch]
+                embeddings = executor.submit(self.embedding_function, contents)
 
+                if pending is not None:
+                    total_added += self._add_batch(*pending)
+                pending = (batch, contents, embeddings)
+
+            if pending is not None:
+                total_added += self._add_batch(*pending)
+
+        if total_added:
+            self._save_type_counts()
         logger.info(f"Added {total_added} documents to collection")
         return total_added
 
+    def _add_batch(
+        self,
+        batch: list[dict],
+        contents: list[str],
+        embeddings: Future,
+    ) -> int:
+        """Write a batch of documents once its embeddings are ready."""
+        ids = [doc["id"] for doc in batch]
+
+        # Ensure all metadata values are primitive types
+        cleaned_metadatas = [
+            {
+                k: v if type(v) in PRIMITIVE_TYPES else _clean_metadata_value(v)
+                for k, v in doc.get("metadata", {}).items()
+            }
+            for doc in batch
+        ]
+
+        try:
+            # Passing the embeddings keeps ChromaDB from embedding the batch itself
+            self.collection.add(
+                ids=ids,
+                embeddings=embeddings.result(),
+                documents=contents,
+                metadatas=cleaned_metadatas,
+            )
+        except Exception as e:
+            logger.error(f"Error adding batch: {e}")
+            raise
+
+        if self._type_counts is not None:
+            self._type_counts.update(
+                meta.get("source_type", "unknown") for meta in cleaned_metadatas
+            )
+
+        logger.debug(f"Added batch of {len(batch)} documents")
+        return len(batch)
+
     def query(
         self,
         query_text: str,
@@ -167,22 +271,79 @@ class VectorStore:
             logger.error(f"Query error: {e}")
             return []
 
-        # Transform results into list of documents
-        documents = []
-        if results and results["ids"] and results["ids"][0]:
-            for i, doc_id in enumerate(results["ids"][0]):
-                doc = {
-                    "id": doc_id,
-                    "content": results["documents"][0][i] if results["documents"] else "",
-                    "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                    "distance": results["distances"][0][i] if results["distances"] else 1.0,
-                }
-                # Convert distance to similarity score (ChromaDB uses L2 distance)
-                # Lower distance = more similar
-                doc["score"] = 1 / (1 + doc["distance"])
-                documents.append(doc)
-
-        return documents
+        return self._to_documents(results, 0)
+
+    def query_batch(
+        self,
+        query_embeddings: list[list[float]],
+        n_results: int = 5,
+        where: Optional[dict] = None,
+    ) -> list[list[dict]]:
+        """
+        Query the vector store for several pre-embedded queries at once.
+
+        Args:
+            query_embeddings: Embedding vectors of the queries.
+            n_results: Maximum number of results per query.
+            where: Optional metadata filter, shared by all queries.
+
+        Returns:
+            One list of matching documents per query.
+        """
+        try:
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where,
+                include=["documents", "metadatas", "distances"],
+            )
+        except Exception as e:
+            logger.error(f"Query error: {e}")
+            return [[] for _ in query_embeddings]
+
+        return [self._to_documents(results, q) for q in range(len(query_embeddings))]
+
+    @staticmethod
+    def _to_documents(results: dict, q: int) -> list[dict]:
+        """Transform the ChromaDB results of query q into a list of documents."""
+        if not (results and results["ids"] and results["ids"][q]):
+            return []
+
+        ids = results["ids"][q]
+        contents = results["documents"][q] if results["documents"] else [""] * len(ids)
+        metadatas = results["metadatas"][q] if results["metadatas"] else [{} for _ in ids]
+        distances = results["distances"][q] if results["distances"] else [1.0] * len(ids)
+
+        # Convert distance to similarity score (ChromaDB uses L2 distance)
+        # Lower distance = more similar
+        return [
+            {
+                "id": doc_id,
+                "content": content,
+                "metadata": metadata,
+                "distance": distance,
+                "score": 1 / (1 + distance),
+            }
+            for doc_id, content, metadata, distance in zip(ids, contents, metadatas, distances)
+        ]
+
+    def get_metadatas(self, where: Optional[dict] = None) -> list[dict]:
+        """
+        Get the metadata of all documents matching a filter.
+
+        Args:
+            where: Optional metadata filter.
+
+        Returns:
+            List of metadata dicts.
+        """
+        try:
+            results = self.collection.get(where=where, include=["metadatas"])
+        except Exception as e:
+            logger.error(f"Metadata query error: {e}")
+            return []
+
+        return results["metadatas"] if results and results["metadatas"] else []
 
     def delete_all(self) -> None:
         """Delete all documents from the collection."""
@@ -190,6 +351,8 @@ class VectorStore:
         try:
             self.client.delete_collection(self.collection_name)
             self._collection = None
+            self._type_counts = Counter()
+            self._save_type_counts()
             logger.info(f"Deleted collection '{self.collection_name}'")
         except Exception as e:
             logger.warning(f"Could not delete collection: {e}")
@@ -203,34 +366,86 @@ class VectorStore:
         """
         count = self.collection.count()
 
-        # Get document type distribution
-        type_counts = {}
-        if count > 0:
-            # Sample metadata to get types
-            results = self.collection.get(
-                include=["metadatas"],
-                limit=count,
-            )
-            if results and results["metadatas"]:
-                for meta in results["metadatas"]:
-                    doc_type = meta.get("source_type", "unknown")
-                    type_counts[doc_type] = type_counts.get(doc_type, 0) + 1
-
         return {
             "total_documents": count,
-            "documents_by_type": type_counts,
+            "documents_by_type": dict(self._get_type_counts(count)),
             "collection_name": self.collection_name,
             "last_rebuild": self._last_rebuild,
         }
 
+    def _get_type_counts(self, count: int) -> Counter:
+        """
+        Get the number of documents per source type.
+
+        The counts come from memory or the sidecar file, and are only
+        recomputed from the collection's metadata when they do not add up
+        to the collection size (e.g. a store written by an older version).
+
+        Args:
+            count: Number of documents in the collection.
+        """
+        if self._type_counts is None:
+            self._type_counts = self._load_type_counts()
+
+        if self._type_counts is None or sum(self._type_counts.values()) != count:
+            type_counts = Counter()
+            if count > 0:
+                results = self.collection.get(include=["metadatas"], limit=count)
+                if results and results["metadatas"]:
+                    type_counts.update(
+                        meta.get("source_type", "unknown") for meta in results["metadatas"]
+                    )
+            self._type_counts = type_counts
+            self._save_type_counts()
+
+        return self._type_counts
+
+    def _load_type_counts(self) -> Optional[Counter]:
+        """Read the per-type document counts from the sidecar file."""
+        if not self.persist_directory:
+            return None
+        try:
+            path = self.persist_directory / TYPE_COUNTS_FILE
+            return Counter(orjson.loads(path.read_bytes()))
+        except (OSError, orjson.JSONDecodeError, TypeError, ValueError):
+            return None
+
+    def _save_type_counts(self) -> None:
+        """Write the per-type document counts to the sidecar file."""
+        if not self.persist_directory or self._type_counts is None:
+            return
+        try:
+            path = self.persist_directory / TYPE_COUNTS_FILE
+            # Write to a temporary file first so readers never see a partial file
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(orjson.dumps(dict(self._type_counts)))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not save document counts: {e}")
+
     def set_rebuild_timestamp(self) -> None:
         """Set the timestamp for the last rebuild."""
         self._last_rebuild = datetime.now()
 
     def document_exists(self, doc_id: str) -> bool:
         """Check if a document exists in the store."""
+        return bool(self.documents_exist([doc_id]))
+
+    def documents_exist(self, doc_ids: list[str]) -> set[str]:
+        """
+        Check which of several documents exist in the store, in one query.
+
+        Args:
+            doc_ids: Document IDs to look up.
+
+        Returns:
+            The IDs that exist.
+        """
+        if not doc_ids:
+            return set()
         try:
-            result = self.collection.get(ids=[doc_id])
-            return bool(result and result["ids"])
+            # Only the IDs are needed, so no payload is read
+            result = self.collection.get(ids=doc_ids, include=[])
+            return set(result["ids"]) if result and result["ids"] else set()
         except Exception:
-            return False
+            return set()
@@ -3,7 +3,18 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Optional, Set, Any
+from typing import Dict, Iterator, List, Optional, Set, Any
+
+
+# Entity types of coverage/premium entities (dekkingen)
+COVERAGE_TYPES = frozenset({
+    "AN", "DA", "DR", "CA", "WA", "KA", "VO", "BH", "AO",
+    "CY", "DC", "AU", "AZ", "BI", "BK", "BQ", "BR", "BW",
+    "BZ", "CD", "CG", "DD", "DF", "DG", "DH", "DI", "DJ",
+    "DK", "DL", "DM", "DN", "DP", "DQ", "DS", "DT", "DU",
+    "DV", "DX", "EA", "EB", "EC", "ED", "EE", "EF", "EG",
+    "EH", "EI", "EJ", "EK", "EM", "EN", "EO", "EP", "EQ",
+})
 
 
 class Severity(Enum):
@@ -37,7 +48,40 @@ class Engine(Enum):
     FINAL = 4   # Final validation and certification
 
 
-@dataclass
+# Criticality by engine, for engines where it does not depend on the rule:
+# Engine 0 (XSD) and Engine 1 (Schema) are always KRITIEK, Engine 3 (LLM)
+# is always AANDACHT
+ENGINE_CRITICALITY = {
+    Engine.XSD: Criticality.KRITIEK,
+    Engine.SCHEMA: Criticality.KRITIEK,
+    Engine.LLM: Criticality.AANDACHT,
+}
+
+# Serialized enum values, looked up instead of going through Enum.value
+# for every finding; findings without criticality are reported as AANDACHT
+SEVERITY_VALUES = {severity: severity.value for severity in Severity}
+ENGINE_VALUES = {engine: engine.value for engine in Engine}
+CRITICALITY_VALUES = {
+    None: Criticality.AANDACHT.value,
+    **{criticality: criticality.value for criticality in Criticality},
+}
+
+# Hard business rules (KRITIEK); all other Engine 2 rules are AANDACHT
+KRITIEK_RULES = frozenset({
+    "E2-001",  # VOLGNUM niet sequentieel
+    "E2-002",  # PP_BTP som onjuist
+    "E2-003",  # Meerdere prolongatiemaanden
+    "E2-004",  # XD-entiteit verboden
+    "E2-005",  # BO_BRPRM afwijkend
+    "E2-006",  # Datum logica fout
+    "E2-008",  # BSN/KVK ongeldig (when FOUT severity)
+    "E2-010",  # PP_TTOT som onjuist
+    "E2-011",  # IBAN ongeldig
+    "E2-013",  # Branche-dekking mismatch
+})
+
+
+@dataclass(slots=True)
 class Finding:
     """A single validation finding."""
 
@@ -68,41 +112,24 @@ class Finding:
         AANDACHT: Engine 2 soft rules, Engine 3 (LLM)
         INFO: Informational messages
         """
-        # Engine 0 (XSD) and Engine 1 (Schema) are always KRITIEK
-        if self.engine in (Engine.XSD, Engine.SCHEMA):
-            return Criticality.KRITIEK
+        # Engines whose findings always have the same criticality
+        criticality = ENGINE_CRITICALITY.get(self.engine)
+        if criticality is not None:
+            return criticality
 
         # Engine 2: Depends on rule code
-        if self.engine == Engine.RULES:
-            # Hard rules (KRITIEK): E2-001, E2-002, E2-003, E2-004, E2-005, E2-006,
-            # E2-008 (BSN), E2-010, E2-011, E2-013
-            kritiek_rules = {
-                "E2-001",  # VOLGNUM niet sequentieel
-                "E2-002",  # PP_BTP som onjuist
-                "E2-003",  # Meerdere prolongatiemaanden
-                "E2-004",  # XD-entiteit verboden
-                "E2-005",  # BO_BRPRM afwijkend
-                "E2-006",  # Datum logica fout
-                "E2-008",  # BSN/KVK ongeldig (when FOUT severity)
-                "E2-010",  # PP_TTOT som onjuist
-                "E2-011",  # IBAN ongeldig
-                "E2-013",  # Branche-dekking mismatch
-            }
-            if self.code in kritiek_rules:
+        if self.engine is Engine.RULES:
+            if self.code in KRITIEK_RULES:
                 # E2-008 can be WAARSCHUWING for KVK, only KRITIEK for FOUT severity
-                if self.code == "E2-008" and self.severity != Severity.FOUT:
+                if self.code == "E2-008" and self.severity is not Severity.FOUT:
                     return Criticality.AANDACHT
                 return Criticality.KRITIEK
 
             # Soft rules (AANDACHT): E2-007, E2-009, E2-012, E2-014, E2-015, E2-016, E2-017
             return Criticality.AANDACHT
 
-        # Engine 3 (LLM) is always AANDACHT
-        if self.engine == Engine.LLM:
-            return Criticality.AANDACHT
-
         # Default to INFO for other cases (Engine.FINAL)
-        if self.severity == Severity.INFO:
+        if self.severity is Severity.INFO:
             return Criticality.INFO
 
         return Criticality.AANDACHT
@@ -110,8 +137,8 @@ class Finding:
     def to_dict(self) -> Dict[str, Any]:
         """Convert finding to dictionary."""
         result = {
-            "severity": self.severity.value,
-            "engine": self.engine.value,
+            "severity": SEVERITY_VALUES[self.severity],
+            "engine": ENGINE_VALUES[self.engine],
             "code": self.code,
             "regeltype": self.regeltype,
             "contract": self.contract,
@@ -122,7 +149,7 @@ class Finding:
             "omschrijving": self.omschrijving,
             "verwacht": self.verwacht,
             "bron": self.bron,
-            "criticality": self.criticality.value if self.criticality else Criticality.AANDACHT.value,
+            "criticality": CRITICALITY_VALUES[self.criticality],
         }
         # Include line number if available
         if self.regel is not None:
@@ -130,7 +157,7 @@ class Finding:
         return result
 
 
-@dataclass
+@dataclass(slots=True)
 class EntityData:
     """Data for a single entity instance in a contract."""
 
@@ -150,14 +177,20 @@ class EntityData:
 
     def get_all_descendants(self) -> List["EntityData"]:
         """Get all descendant entities recursively."""
-        descendants = []
-        for child in self.children:
-            descendants.append(child)
-            descendants.extend(child.get_all_descendants())
-        return descendants
+        return list(_iter_entities(self.children))
 
 
-@dataclass
+def _iter_entities(entities: List[EntityData]) -> Iterator[EntityData]:
+    """Walk entities and their descendants depth-first, parents before children."""
+    stack = entities[::-1]
+    while stack:
+        entity = stack.pop()
+        yield entity
+        if entity.children:
+            stack.extend(reversed(entity.children))
+
+
+@dataclass(slots=True)
 class ContractData:
     """Data for a single contract in a batch."""
 
@@ -165,6 +198,35 @@ class ContractData:
     branche: str  # e.g., "037"
     entities: List[EntityData] = field(default_factory=list)
     raw_xml: Optional[str] = None  # Original XML for LLM analysis
+    # Flattened entity tree and entities by type, built on first use; the
+    # tree must not change afterwards unless the cache is invalidated
+    _all_entities: Optional[List[EntityData]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _entities_by_type: Optional[Dict[str, List[EntityData]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def add_entity(self, entity: EntityData) -> None:
+        """Add a top-level entity."""
+        self.entities.append(entity)
+        self.invalidate_entity_cache()
+
+    def invalidate_entity_cache(self) -> None:
+        """Drop the flattened entity tree, after entities were changed directly."""
+        self._all_entities = None
+        self._entities_by_type = None
+
+    def _flatten(self) -> List[EntityData]:
+        """Get the cached flattened entity tree, building it if needed."""
+        if self._all_entities is None:
+            all_entities = list(_iter_entities(self.entities))
+            by_type: Dict[str, List[EntityData]] = {}
+            for entity in all_entities:
+                by_type.setdefault(entity.entity_type, []).append(entity)
+            self._all_entities = all_entities
+            self._entities_by_type = by_type
+        return self._all_entities
 
     def get_entities_by_type(self, entity_type: str) -> List[EntityData]:
         """Get all entities of a specific type (top-level only)."""
@@ -172,15 +234,12 @@ class ContractData:
 
     def get_all_entities_recursive(self) -> List[EntityData]:
         """Get all entities including nested children."""
-        all_entities = []
-        for entity in self.entities:
-            all_entities.append(entity)
-            all_entities.extend(entity.get_all_descendants())
-        return all_entities
+        return list(self._flatten())
 
     def get_entities_by_type_recursive(self, entity_type: str) -> List[EntityData]:
         """Get all entities of a specific type including nested."""
-        return [e for e in self.get_all_entities_recursive() if e.entity_type == entity_type]
+        self._flatten()
+        return list(self._entities_by_type.get(entity_type, ()))
 
     def get_all_entity_types(self) -> Set[str]:
         """Get set of all entity types in this contract."""
@@ -188,22 +247,15 @@ class ContractData:
 
     def get_all_entity_types_recursive(self) -> Set[str]:
         """Get set of all entity types including nested."""
-        return {e.entity_type for e in self.get_all_entities_recursive()}
+        self._flatten()
+        return set(self._entities_by_type)
 
     def get_premium_entities(self) -> List[EntityData]:
         """Get all coverage/premium entities (dekkingen)."""
-        coverage_types = {
-            "AN", "DA", "DR", "CA", "WA", "KA", "VO", "BH", "AO",
-            "CY", "DC", "AU", "AZ", "BI", "BK", "BQ", "BR", "BW",
-            "BZ", "CD", "CG", "DD", "DF", "DG", "DH", "DI", "DJ",
-            "DK", "DL", "DM", "DN", "DP", "DQ", "DS", "DT", "DU",
-            "DV", "DX", "EA", "EB", "EC", "ED", "EE", "EF", "EG",
-            "EH", "EI", "EJ", "EK", "EM", "EN", "EO", "EP", "EQ",
-        }
-        return [e for e in self.get_all_entities_recursive() if e.entity_type in coverage_types]
+        return [e for e in self._flatten() if e.entity_type in COVERAGE_TYPES]
 
 
-@dataclass
+@dataclass(slots=True)
 class BatchData:
     """Data for an entire batch of contracts."""
 
@@ -245,7 +297,7 @@ class ValidationEngine(ABC):
         return self.validate(batch)
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationCertificate:
     """Certificate confirming XML is ready to send."""
 
@@ -274,7 +326,7 @@ class ValidationCertificate:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     """Result of validation including findings and optional certificate."""
 
@@ -14,7 +14,13 @@ from engines.base import (
     Severity,
     ValidationEngine,
 )
-from knowledge.prompts import SYSTEM_PROMPT, get_analysis_prompt
+from knowledge.prompts import SYSTEM_PROMPT, get_analysis_prompt_parts
+
+# Marks the end of a prompt prefix that Anthropic may cache between calls
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# System prompt blocks, built once; the prompt is cached server-side
+SYSTEM_BLOCKS = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": CACHE_CONTROL}]
 
 
 class LLMSemanticEngine(ValidationEngine):
@@ -75,8 +81,8 @@ class LLMSemanticEngine(ValidationEngine):
         # Build XML representation for analysis
         contracts_xml = self._build_contracts_xml(contracts)
 
-        # Get analysis prompt
-        prompt = get_analysis_prompt(contracts_xml)
+        # Get analysis prompt; the rules part is the same for every call
+        rules_prompt, contracts_prompt = get_analysis_prompt_parts(contracts_xml)
 
         try:
             # Call Claude API
@@ -84,8 +90,14 @@ class LLMSemanticEngine(ValidationEngine):
                 model=self.config.llm_model,
                 max_tokens=self.config.llm_max_tokens,
                 temperature=self.config.llm_temperature,
-                system=SYSTEM_PROMPT,
-                messages=[{"role": "user", "content": prompt}],
+                system=SYSTEM_BLOCKS,
+                messages=[{
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": rules_prompt, "cache_control": CACHE_CONTROL},
+                        {"type": "text", "text": contracts_prompt},
+                    ],
+                }],
             )
 
             # Parse response
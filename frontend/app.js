@@ -1788,28 +1788,48 @@ async function loadSuggestions(finding) {
             headers['X-API-Key'] = apiKeyInput.value.trim();
         }
 
-        const response = await fetch('/api/chat/suggest', {
+        // Suggestions arrive as server-sent events, one question per event
+        const response = await fetch('/api/chat/suggest/stream', {
             method: 'POST',
             headers: headers,
             body: JSON.stringify({ finding: finding })
         });
 
-        if (response.ok) {
-            const data = await response.json();
-            if (data.questions && data.questions.length > 0) {
-                suggestionsList.innerHTML = '';
-                data.questions.forEach(question => {
-                    const btn = document.createElement('button');
-                    btn.className = 'suggestion-btn';
-                    btn.textContent = question;
-                    btn.addEventListener('click', () => {
-                        document.getElementById('chatInput').value = question;
-                        document.getElementById('chatSend').disabled = false;
-                        sendChatMessage();
-                    });
-                    suggestionsList.appendChild(btn);
-                });
-                suggestionsDiv.hidden = false;
+        if (!response.ok) {
+            return;
+        }
+
+        suggestionsList.innerHTML = '';
+
+        const addSuggestion = (question) => {
+            const btn = document.createElement('button');
+            btn.className = 'suggestion-btn';
+            btn.textContent = question;
+            btn.addEventListener('click', () => {
+                document.getElementById('chatInput').value = question;
+                document.getElementById('chatSend').disabled = false;
+                sendChatMessage();
+            });
+            suggestionsList.appendChild(btn);
+            suggestionsDiv.hidden = false;
+        };
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+
+            for (const event of events) {
+                if (event.startsWith('data: ')) {
+                    addSuggestion(JSON.parse(event.slice(6)));
+                }
             }
         }
     } catch (error) {
@@ -1859,20 +1879,60 @@ async function sendChatMessage() {
             requestBody.finding_context = chatFindingContext;
         }
 
-        const response = await fetch('/api/chat', {
+        // The answer arrives as server-sent events while it is generated,
+        // followed by a 'done' event with the complete response
+        const response = await fetch('/api/chat/stream', {
             method: 'POST',
             headers: headers,
             body: JSON.stringify(requestBody)
         });
 
-        loadingDiv.remove();
-
         if (!response.ok) {
+            loadingDiv.remove();
             const errorData = await response.json().catch(() => ({}));
             throw new Error(errorData.detail || 'Chat request failed');
         }
 
-        const data = await response.json();
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let answer = '';
+        let streamingDiv = null;
+        let data = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+
+            for (const event of events) {
+                if (event.startsWith('event: done\ndata: ')) {
+                    data = JSON.parse(event.slice('event: done\ndata: '.length));
+                } else if (event.startsWith('data: ')) {
+                    answer += JSON.parse(event.slice(6));
+                    if (!streamingDiv) {
+                        loadingDiv.remove();
+                        streamingDiv = addChatMessage('assistant', answer);
+                    } else {
+                        streamingDiv.querySelector('.message-content span').innerHTML = parseMarkdown(answer);
+                        chatMessages.scrollTop = chatMessages.scrollHeight;
+                    }
+                }
+            }
+        }
+
+        loadingDiv.remove();
+        if (streamingDiv) {
+            streamingDiv.remove();
+        }
+
+        if (!data) {
+            throw new Error('Chat request failed');
+        }
+
         chatConversationId = data.conversation_id;
 
         addChatMessage('assistant', data.message.content, data.message.sources);
@@ -1978,6 +2038,7 @@ function addChatMessage(role, content, sources = null) {
     messageDiv.appendChild(contentDiv);
     chatMessages.appendChild(messageDiv);
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    return messageDiv;
 }
 
 // ========================================
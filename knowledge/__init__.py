@@ -2,7 +2,7 @@
 
 from .codelist_loader import BranchHierarchy, load_branch_hierarchy
 from .expert_rules import EXPERT_RULES, ExpertRule
-from .prompts import SYSTEM_PROMPT, get_analysis_prompt
+from .prompts import SYSTEM_PROMPT, get_analysis_prompt, get_analysis_prompt_parts
 
 __all__ = [
     "BranchHierarchy",
@@ -11,4 +11,5 @@ __all__ = [
     "ExpertRule",
     "SYSTEM_PROMPT",
     "get_analysis_prompt",
+    "get_analysis_prompt_parts",
 ]
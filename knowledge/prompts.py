@@ -62,10 +62,28 @@ Retourneer uitsluitend het JSON-object, geen andere tekst."""
 
 def get_analysis_prompt(contracts_xml: str) -> str:
     """Get the analysis prompt with contracts XML."""
-    return ANALYSIS_PROMPT_TEMPLATE.format(
-        rule_descriptions=get_rule_descriptions(),
-        contracts_xml=contracts_xml,
+    return "".join(get_analysis_prompt_parts(contracts_xml))
+
+
+# The analysis prompt up to the contracts is the same for every call
+_CONTRACTS_HEADING = "## Contract(en) om te analyseren"
+_ANALYSIS_PREFIX_TEMPLATE, _, _ANALYSIS_SUFFIX_TEMPLATE = ANALYSIS_PROMPT_TEMPLATE.partition(
+    _CONTRACTS_HEADING
+)
+
+
+def get_analysis_prompt_parts(contracts_xml: str) -> tuple[str, str]:
+    """
+    Get the analysis prompt split into a static prefix and the contracts part.
+
+    The prefix (instructions and rule descriptions) does not depend on the
+    contracts, so it can be marked for prompt caching.
+    """
+    prefix = _ANALYSIS_PREFIX_TEMPLATE.format(rule_descriptions=get_rule_descriptions())
+    contracts = _CONTRACTS_HEADING + _ANALYSIS_SUFFIX_TEMPLATE.format(
+        contracts_xml=contracts_xml
     )
+    return prefix, contracts
 
 
 BATCH_ANALYSIS_PROMPT = """Analyseer de volgende batch van SIVI ADN contracten op batch-niveau problemen.
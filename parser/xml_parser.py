@@ -81,7 +81,7 @@ class XMLParser:
                 entity = self._parse_entity(child)
 
             if entity:
-                contract.entities.append(entity)
+                contract.add_entity(entity)
 
                 # Extract contract number from AL entity
                 if entity.entity_type == "AL":
@@ -294,7 +294,7 @@ class XMLParser:
 
             # Add entity to current contract
             if current_contract_nr and current_contract_nr in contracts:
-                contracts[current_contract_nr].entities.append(entity)
+                contracts[current_contract_nr].add_entity(entity)
 
         return list(contracts.values())
 
@@ -0,0 +1,93 @@
+"""Tests for the validation API."""
+
+import hashlib
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import main
+from api.main import app, etag_matches, report_etag
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+@pytest.fixture
+def client():
+    """Create a test client, shutting down the validation pool afterwards."""
+    yield TestClient(app)
+    if main._validation_pool is not None:
+        main._validation_pool.shutdown()
+        main._validation_pool = None
+    main._validation_cache.clear()
+
+
+@pytest.fixture
+def content():
+    """Read a sample batch to upload."""
+    return (FIXTURES / "sample_with_errors.xml").read_bytes()
+
+
+def upload(client, content, engines="2", etag=None):
+    """Post a batch to the validate endpoint."""
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.post(
+        f"/api/validate?engines={engines}",
+        files={"file": ("batch.xml", content, "text/xml")},
+        headers=headers,
+    )
+
+
+class TestReportEtag:
+    """Test building and matching report ETags."""
+
+    def test_depends_on_options(self):
+        """Test every input that changes the report changes the ETag."""
+        digest = hashlib.sha256(b"<batch/>").digest()
+        etag = report_etag(digest, "a.xml", frozenset({0, 2}), False)
+
+        assert etag.startswith('W/"')
+        assert etag == report_etag(digest, "a.xml", frozenset({2, 0}), False)
+        assert etag != report_etag(digest, "b.xml", frozenset({0, 2}), False)
+        assert etag != report_etag(digest, "a.xml", frozenset({0}), False)
+        assert etag != report_etag(digest, "a.xml", frozenset({0, 2}), True)
+        assert etag != report_etag(hashlib.sha256(b"<x/>").digest(), "a.xml", frozenset({0, 2}), False)
+
+    def test_matches(self):
+        """Test If-None-Match lists and wildcards."""
+        etag = 'W/"abc-2-0"'
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'W/"other", {etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('W/"other"', etag)
+
+
+class TestValidateRevalidation:
+    """Test conditional requests to the validate endpoint."""
+
+    def test_not_modified_without_validating(self, client, content, monkeypatch):
+        """Test a matching If-None-Match is answered before any validation."""
+        async def fail(*args, **kwargs):
+            raise AssertionError("validation should not run")
+
+        monkeypatch.setattr(main, "run_validation", fail)
+        etag = report_etag(hashlib.sha256(content).digest(), "batch.xml", frozenset({2}), False)
+
+        response = upload(client, content, etag=etag)
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+    def test_revalidate_report(self, client, content):
+        """Test a report's ETag revalidates it until an option changes."""
+        response = upload(client, content)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+
+        assert upload(client, content, etag=etag).status_code == 304
+        assert upload(client, content, engines="2,5", etag=etag).status_code == 200
+        assert upload(client, content + b"\n", etag=etag).status_code == 200
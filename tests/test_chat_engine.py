@@ -0,0 +1,185 @@
+"""Tests for the chat engine."""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+from chatbot.chat.engine import ChatEngine
+from chatbot.models.schemas import ChatRequest, FindingContext
+
+API_KEY = "sk-test"
+
+
+class FakeEmbeddingModel:
+    """Embedding model returning the same vector for every text."""
+
+    def embed_query(self, query):
+        return np.array([1.0, 0.5, 0.25])
+
+    def embed_queries(self, queries):
+        return [self.embed_query(query) for query in queries]
+
+
+class FakeVectorStore:
+    """Vector store returning one document per query."""
+
+    embedding_function = SimpleNamespace(embedding_model=FakeEmbeddingModel())
+
+    def query_batch(self, query_embeddings, n_results=5, where=None):
+        document = {
+            "id": "doc1",
+            "content": "inhoud",
+            "metadata": {"source_type": "xsd", "title": "Formaten"},
+            "score": 0.8,
+        }
+        return [[document] for _ in query_embeddings]
+
+    def get_metadatas(self, where=None):
+        return []
+
+
+class FakeStream:
+    """Streamed answer, optionally failing after the first piece."""
+
+    def __init__(self, events, fail):
+        self.events = events
+        self.fail = fail
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @property
+    async def text_stream(self):
+        for piece in ("Het ", "antwoord."):
+            await asyncio.sleep(0)
+            if self.fail and piece != "Het ":
+                raise RuntimeError("connection reset")
+            yield piece
+        self.events.append("answer done")
+
+
+class FakeMessages:
+    """Messages API recording the order in which calls run."""
+
+    def __init__(self, fail_stream=False, block_suggestions=False):
+        self.events = []
+        self.fail_stream = fail_stream
+        self.block_suggestions = block_suggestions
+        self.suggestions_cancelled = False
+        self.suggestions_started = threading.Event()
+
+    def stream(self, **kwargs):
+        return FakeStream(self.events, self.fail_stream)
+
+    async def create(self, **kwargs):
+        self.events.append("suggestions started")
+        self.suggestions_started.set()
+        if self.block_suggestions:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                self.suggestions_cancelled = True
+                raise
+        return SimpleNamespace(content=[SimpleNamespace(text="Vraag 1?\nVraag 2?")])
+
+
+FINDING = FindingContext(code="E1-002", severity="FOUT", engine=1, entiteit="AN")
+
+
+class TestChatStream:
+    """Test the work done for one chat turn."""
+
+    @pytest.fixture
+    def make_engine(self, tmp_path):
+        """Create engines on fake vector stores and Anthropic clients."""
+        def make(**kwargs):
+            engine = ChatEngine(sivi_dir=tmp_path, data_dir=tmp_path, api_key=API_KEY)
+            engine._vector_store = FakeVectorStore()
+            messages = FakeMessages(**kwargs)
+            engine._clients[API_KEY] = SimpleNamespace(messages=messages)
+            return engine, messages
+
+        return make
+
+    def test_answer_and_suggestions(self, make_engine):
+        """Test a turn returns the answer, sources and suggestions and is stored."""
+        engine, _ = make_engine()
+
+        async def run():
+            response = await engine.chat(ChatRequest(message="Waarom?", finding_context=FINDING))
+            conversation = await engine.history.get_conversation(response.conversation_id)
+            await engine.close()
+            return response, conversation
+
+        response, conversation = asyncio.run(run())
+        assert response.message.content == "Het antwoord."
+        assert [source.title for source in response.message.sources] == ["Formaten"]
+        assert response.suggested_questions == ["Vraag 1?", "Vraag 2?"]
+        assert [m["content"] for m in conversation["messages"]] == ["Waarom?", "Het antwoord."]
+
+    def test_suggestions_overlap_answer(self, make_engine):
+        """Test suggestions are requested while the answer is streamed."""
+        engine, messages = make_engine()
+
+        async def run():
+            await engine.chat(ChatRequest(message="Waarom?", finding_context=FINDING))
+            await engine.close()
+
+        asyncio.run(run())
+        assert messages.events == ["suggestions started", "answer done"]
+
+    def test_partial_answer_not_stored(self, make_engine):
+        """Test an answer cut short by an API error is not persisted."""
+        engine, _ = make_engine(fail_stream=True)
+
+        async def run():
+            response = await engine.chat(ChatRequest(message="Waarom?", finding_context=FINDING))
+            stats = await engine.history.get_stats()
+            await engine.close()
+            return response, stats
+
+        response, stats = asyncio.run(run())
+        assert response.message.content == "Het "
+        assert stats["message_count"] == 0
+
+    def test_closing_stream_cancels_suggestions(self, make_engine):
+        """Test a client disconnecting mid-answer stops the suggestion request."""
+        engine, messages = make_engine(block_suggestions=True)
+
+        async def run():
+            stream = engine.chat_stream(ChatRequest(message="Waarom?", finding_context=FINDING))
+            await stream.__anext__()
+            await stream.aclose()
+            await asyncio.sleep(0)
+            await engine.close()
+
+        asyncio.run(run())
+        assert messages.suggestions_cancelled
+
+    def test_context_error_cancels_suggestions(self, make_engine):
+        """Test a failure while building the context stops the suggestion request."""
+        engine, messages = make_engine(block_suggestions=True)
+
+        def fail(*args, **kwargs):
+            # Runs in a worker thread; fail once the suggestions are in flight
+            messages.suggestions_started.wait(timeout=5)
+            raise ValueError("vector store unavailable")
+
+        async def run():
+            engine.context_builder.build_context = fail
+            with pytest.raises(ValueError):
+                await engine.chat(ChatRequest(message="Waarom?", finding_context=FINDING))
+            await asyncio.sleep(0)
+            await engine.close()
+
+        asyncio.run(run())
+        assert messages.suggestions_cancelled
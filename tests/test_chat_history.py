@@ -0,0 +1,293 @@
+"""Tests for the chat history database."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from chatbot import history as history_module
+from chatbot.history import ULID_ALPHABET, ChatHistory
+
+
+async def _query(history: ChatHistory, sql: str, params: tuple = ()) -> list:
+    """Run a query on the history's connection and return all rows."""
+    cursor = await history._db.execute(sql, params)
+    return [tuple(row) for row in await cursor.fetchall()]
+
+
+class TestConnection:
+    """Test the shared database connection."""
+
+    @pytest.fixture
+    def history(self, tmp_path):
+        """Create a history database in a temporary directory."""
+        return ChatHistory(tmp_path / "chat_history.db")
+
+    def test_connection_reused(self, history):
+        """Test every call uses the connection opened by the first one."""
+        async def run():
+            conversation_id = await history.create_conversation("batch.xml")
+            db = history._db
+            await history.add_message(conversation_id, "user", "Waarom?")
+            await history.get_conversation(conversation_id)
+            await history.list_conversations()
+            same = history._db is db
+            await history.close()
+            return same
+
+        assert asyncio.run(run())
+
+    def test_concurrent_initialize_opens_once(self, history, monkeypatch):
+        """Test concurrent first calls share a single connection."""
+        import aiosqlite
+
+        opened = []
+        connect = aiosqlite.connect
+
+        def counting_connect(*args, **kwargs):
+            opened.append(args)
+            return connect(*args, **kwargs)
+
+        monkeypatch.setattr(aiosqlite, "connect", counting_connect)
+
+        async def run():
+            await asyncio.gather(*[history.list_conversations() for _ in range(5)])
+            await history.close()
+
+        asyncio.run(run())
+        assert len(opened) == 1
+
+    def test_reopened_after_close(self, history):
+        """Test the database can be used again after close()."""
+        async def run():
+            conversation_id = await history.create_conversation()
+            await history.close()
+            conversation = await history.get_conversation(conversation_id)
+            await history.close()
+            return conversation
+
+        assert asyncio.run(run())["id"]
+
+
+class TestRecordTurn:
+    """Test storing a question and answer in one transaction."""
+
+    @pytest.fixture
+    def history(self, tmp_path):
+        """Create a history database in a temporary directory."""
+        return ChatHistory(tmp_path / "chat_history.db")
+
+    def test_stores_turn_and_conversation(self, history):
+        """Test a turn creates the conversation and both messages."""
+        async def run():
+            conversation_id = history.new_conversation_id()
+            await history.record_turn(
+                conversation_id, "Waarom?", "Daarom.",
+                sources=[{"title": "T"}], finding_context={"code": "E1-002"},
+                validation_file="batch.xml",
+            )
+            conversation = await history.get_conversation(conversation_id)
+            await history.close()
+            return conversation
+
+        conversation = asyncio.run(run())
+        assert conversation["validation_file"] == "batch.xml"
+        messages = conversation["messages"]
+        assert [(m["role"], m["content"]) for m in messages] == [
+            ("user", "Waarom?"),
+            ("assistant", "Daarom."),
+        ]
+        assert messages[0]["finding_context"] == {"code": "E1-002"}
+        assert messages[1]["sources"] == [{"title": "T"}]
+
+    def test_failed_turn_is_rolled_back(self, history):
+        """Test a failing statement leaves nothing behind for the next commit."""
+        async def run():
+            failed_id = history.new_conversation_id()
+            with pytest.raises(Exception):
+                # The assistant message violates NOT NULL after the
+                # conversation and user message were inserted
+                await history.record_turn(failed_id, "Waarom?", None)
+
+            other_id = history.new_conversation_id()
+            await history.record_turn(other_id, "En nu?", "Zo.")
+
+            failed = await history.get_conversation(failed_id)
+            stats = await history.get_stats()
+            await history.close()
+            return failed, stats
+
+        failed, stats = asyncio.run(run())
+        assert failed is None
+        assert stats["conversation_count"] == 1
+        assert stats["message_count"] == 2
+
+
+class TestAnswerCache:
+    """Test the persistent answer cache."""
+
+    @pytest.fixture
+    def history(self, tmp_path):
+        """Create a history database in a temporary directory."""
+        return ChatHistory(tmp_path / "chat_history.db")
+
+    def test_roundtrip(self, history):
+        """Test a stored answer is returned for its prompt hash."""
+        async def run():
+            await history.store_cached_answer(b"hash", "antwoord")
+            found = await history.get_cached_answer(b"hash")
+            missing = await history.get_cached_answer(b"other")
+            await history.close()
+            return found, missing
+
+        assert asyncio.run(run()) == ("antwoord", None)
+
+    def test_expired_answer_not_returned(self, history):
+        """Test answers older than the maximum age are ignored."""
+        async def run():
+            await history.initialize()
+            await history._db.execute(
+                "INSERT INTO answer_cache (hash, answer, created_at) "
+                "VALUES (?, ?, datetime('now', '-400 days'))",
+                (b"old", "oud"),
+            )
+            await history._db.commit()
+            found = await history.get_cached_answer(b"old")
+            await history.close()
+            return found
+
+        assert asyncio.run(run()) is None
+
+    def test_pruned_to_maximum(self, history, monkeypatch):
+        """Test the oldest answers beyond the maximum are removed."""
+        monkeypatch.setattr(history_module, "ANSWER_CACHE_MAX_ENTRIES", 5)
+        monkeypatch.setattr(history_module, "ANSWER_CACHE_PRUNE_INTERVAL", 3)
+
+        async def run():
+            for i in range(9):
+                await history.store_cached_answer(bytes([i]), f"a{i}")
+            rows = await _query(history, "SELECT answer FROM answer_cache ORDER BY rowid")
+            await history.close()
+            return [answer for (answer,) in rows]
+
+        assert asyncio.run(run()) == ["a4", "a5", "a6", "a7", "a8"]
+
+
+class TestConversationTrigger:
+    """Test the trigger keeping conversations' updated_at current."""
+
+    @pytest.fixture
+    def history(self, tmp_path):
+        """Create a history database in a temporary directory."""
+        return ChatHistory(tmp_path / "chat_history.db")
+
+    def test_trigger_touches_conversation(self, history):
+        """Test inserting messages updates the conversation's updated_at."""
+        async def run():
+            conversation_id = history.new_conversation_id()
+            await history.record_turn(conversation_id, "Waarom?", "Daarom.")
+            await history._db.execute(
+                "UPDATE conversations SET updated_at = '2000-01-01 00:00:00' WHERE id = ?",
+                (conversation_id,),
+            )
+            await history._db.commit()
+
+            await history.record_turn(conversation_id, "En nu?", "Zo.")
+            rows = await _query(
+                history, "SELECT updated_at FROM conversations WHERE id = ?", (conversation_id,)
+            )
+            await history.close()
+            return rows[0][0]
+
+        assert asyncio.run(run()) > "2000-01-01 00:00:00"
+
+
+class TestConversationIds:
+    """Test ULID conversation IDs."""
+
+    def test_format(self):
+        """Test IDs are 26 Crockford base32 characters."""
+        conversation_id = ChatHistory.new_conversation_id()
+        assert len(conversation_id) == 26
+        assert set(conversation_id) <= set(ULID_ALPHABET)
+
+    def test_sorted_by_creation_time(self, monkeypatch):
+        """Test IDs created later sort after earlier ones."""
+        now = [1_700_000_000_000_000_000]
+
+        def fake_time_ns():
+            now[0] += 1_000_000  # one millisecond per ID
+            return now[0]
+
+        monkeypatch.setattr(history_module.time, "time_ns", fake_time_ns)
+        ids = [ChatHistory.new_conversation_id() for _ in range(50)]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+
+
+class TestWriteTransactions:
+    """Test that failed writes leave nothing pending on the shared connection."""
+
+    @pytest.fixture
+    def history(self, tmp_path):
+        """Create a history database in a temporary directory."""
+        return ChatHistory(tmp_path / "chat_history.db")
+
+    def test_failed_delete_rolled_back(self, history):
+        """Test a delete failing halfway keeps the conversation's messages."""
+        async def run():
+            conversation_id = history.new_conversation_id()
+            await history.record_turn(conversation_id, "Waarom?", "Daarom.")
+            # Let the conversation DELETE fail after the messages DELETE ran
+            await history._db.execute("""
+                CREATE TRIGGER fail_delete BEFORE DELETE ON conversations
+                BEGIN SELECT RAISE(ABORT, 'database is locked'); END
+            """)
+            await history._db.commit()
+
+            with pytest.raises(Exception):
+                await history.delete_conversation(conversation_id)
+
+            # The next writer's commit must not store the half-finished delete
+            await history.record_turn(history.new_conversation_id(), "En nu?", "Zo.")
+            conversation = await history.get_conversation(conversation_id)
+            await history.close()
+            return conversation
+
+        conversation = asyncio.run(run())
+        assert len(conversation["messages"]) == 2
+
+    def test_delete(self, history):
+        """Test deleting removes the conversation and reports whether it existed."""
+        async def run():
+            conversation_id = await history.create_conversation()
+            await history.add_message(conversation_id, "user", "Waarom?")
+            deleted = await history.delete_conversation(conversation_id)
+            again = await history.delete_conversation(conversation_id)
+            stats = await history.get_stats()
+            await history.close()
+            return deleted, again, stats
+
+        deleted, again, stats = asyncio.run(run())
+        assert (deleted, again) == (True, False)
+        assert stats["message_count"] == 0
+
+    def test_failed_create_leaves_connection_usable(self, history, monkeypatch):
+        """Test a failed insert does not block later writes."""
+        async def run():
+            existing = await history.create_conversation()
+            monkeypatch.setattr(history, "new_conversation_id", lambda: existing)
+            with pytest.raises(Exception):
+                await history.create_conversation()
+            monkeypatch.undo()
+
+            await history.add_message(existing, "user", "Waarom?")
+            stats = await history.get_stats()
+            await history.close()
+            return stats
+
+        stats = asyncio.run(run())
+        assert stats["conversation_count"] == 1
+        assert stats["message_count"] == 1
@@ -0,0 +1,76 @@
+"""Tests for the parsed data model."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from engines.base import ContractData, EntityData
+
+
+class TestContractEntityCache:
+    """Test the cached flattened entity tree of a contract."""
+
+    @pytest.fixture
+    def contract(self):
+        """Create a contract with a nested entity tree."""
+        vp = EntityData(entity_type="VP", volgnum=1)
+        da = EntityData(entity_type="DA", volgnum=1)
+        pp = EntityData(entity_type="PP", volgnum=1, children=[vp, da])
+        vp.parent = pp
+        da.parent = pp
+        contract = ContractData(contract_nummer="DL123456", branche="037")
+        contract.add_entity(EntityData(entity_type="AL", volgnum=1))
+        contract.add_entity(pp)
+        return contract
+
+    def test_flattened_in_document_order(self, contract):
+        """Test parents come before their children, in document order."""
+        types = [e.entity_type for e in contract.get_all_entities_recursive()]
+        assert types == ["AL", "PP", "VP", "DA"]
+
+    def test_entities_by_type_recursive(self, contract):
+        """Test nested entities are found by type."""
+        assert len(contract.get_entities_by_type_recursive("VP")) == 1
+        assert contract.get_entities_by_type_recursive("XX") == []
+        assert contract.get_all_entity_types_recursive() == {"AL", "PP", "VP", "DA"}
+
+    def test_premium_entities(self, contract):
+        """Test coverage entities are taken from the whole tree."""
+        assert [e.entity_type for e in contract.get_premium_entities()] == ["DA"]
+
+    def test_returned_lists_are_copies(self, contract):
+        """Test callers cannot modify the cached tree through a result."""
+        contract.get_all_entities_recursive().clear()
+        contract.get_entities_by_type_recursive("VP").clear()
+
+        assert len(contract.get_all_entities_recursive()) == 4
+        assert len(contract.get_entities_by_type_recursive("VP")) == 1
+
+    def test_add_entity_invalidates(self, contract):
+        """Test adding an entity after the tree was built is seen."""
+        contract.get_all_entities_recursive()
+        contract.add_entity(EntityData(entity_type="XD", volgnum=1))
+
+        assert len(contract.get_all_entities_recursive()) == 5
+        assert len(contract.get_entities_by_type_recursive("XD")) == 1
+
+    def test_invalidate_after_direct_change(self, contract):
+        """Test changes to the tree are seen once the cache is invalidated."""
+        pp = contract.get_entities_by_type_recursive("PP")[0]
+        pp.children.append(EntityData(entity_type="DA", volgnum=2, parent=pp))
+
+        assert len(contract.get_entities_by_type_recursive("DA")) == 1
+        contract.invalidate_entity_cache()
+        assert len(contract.get_entities_by_type_recursive("DA")) == 2
+
+    def test_cache_not_part_of_equality(self, contract):
+        """Test a built cache does not change how contracts compare."""
+        other = ContractData(
+            contract_nummer=contract.contract_nummer,
+            branche=contract.branche,
+            entities=list(contract.entities),
+        )
+        contract.get_all_entities_recursive()
+        assert contract == other
@@ -0,0 +1,127 @@
+"""Tests for knowledge base ingestion."""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from chatbot.ingestion import cache as cache_module
+from chatbot.ingestion.cache import IngestionCache
+from chatbot.ingestion.pdf_processor import PDFProcessor
+
+
+class TestPDFChunking:
+    """Test chunking of extracted PDF pages."""
+
+    @pytest.fixture
+    def processor(self):
+        """Create a processor with small chunks."""
+        return PDFProcessor(chunk_size=100, chunk_overlap=20)
+
+    def test_short_pages_combined(self, processor):
+        """Test text of a page that does not fill a chunk is carried over."""
+        pages = [
+            {"page": 1, "text": "Eerste pagina."},
+            {"page": 2, "text": "Tweede pagina."},
+        ]
+        chunks = list(processor._chunk_pages(pages, "handboek.pdf"))
+
+        assert [chunk["content"] for chunk in chunks] == ["Eerste pagina.\n\nTweede pagina."]
+        assert chunks[0]["metadata"]["page"] == 1
+
+    def test_page_tail_not_dropped(self, processor):
+        """Test the trailing text of a page ends up in a chunk."""
+        pages = [
+            {"page": 1, "text": "A" * 80 + "\n\n" + "Staart van pagina een."},
+            {"page": 2, "text": "B" * 80},
+        ]
+        chunks = list(processor._chunk_pages(pages, "handboek.pdf"))
+        content = "".join(chunk["content"] for chunk in chunks)
+
+        assert "Staart van pagina een." in content
+        assert "B" * 80 in content
+
+    def test_chunk_keeps_start_page(self, processor):
+        """Test a chunk spanning two pages is attributed to the first."""
+        pages = [
+            {"page": 1, "text": "A" * 80},
+            {"page": 2, "text": "Kort."},
+            {"page": 3, "text": "C" * 80},
+        ]
+        chunks = list(processor._chunk_pages(pages, "handboek.pdf"))
+
+        assert [chunk["metadata"]["page"] for chunk in chunks] == [1, 3]
+        assert chunks[0]["content"] == "A" * 80 + "\n\nKort."
+
+    def test_chunks_within_size(self, processor):
+        """Test chunks are split at paragraphs before exceeding the size."""
+        text = "\n\n".join(f"Alinea {i} met wat tekst." for i in range(20))
+        chunks = list(processor._chunk_pages([{"page": 1, "text": text}], "handboek.pdf"))
+
+        assert len(chunks) > 1
+        assert all(len(chunk["content"]) <= 100 for chunk in chunks)
+
+
+class TestIngestionCache:
+    """Test invalidation of cached ingestion results."""
+
+    DOCS = [{"id": "doc1", "content": "inhoud", "metadata": {"source_type": "pdf"}}]
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        """Create a source file."""
+        path = tmp_path / "bron.json"
+        path.write_text("{}")
+        return path
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Create a cache in a temporary directory."""
+        return IngestionCache(tmp_path / "cache")
+
+    def test_roundtrip(self, cache, source):
+        """Test documents of an unchanged file are returned."""
+        cache.store(source, self.DOCS, "1000:200")
+        assert cache.load(source, "1000:200") == self.DOCS
+
+    def test_changed_file_invalidates(self, cache, source):
+        """Test an entry is ignored once its file was modified."""
+        cache.store(source, self.DOCS)
+        source.write_text('{"a": 1}')
+
+        assert cache.load(source) is None
+
+    def test_touched_file_invalidates(self, cache, source):
+        """Test an entry is ignored when only the modification time changed."""
+        cache.store(source, self.DOCS)
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert cache.load(source) is None
+
+    def test_other_variant_misses(self, cache, source):
+        """Test entries are only used for the same processor settings."""
+        cache.store(source, self.DOCS, "1000:200")
+        assert cache.load(source, "500:100") is None
+
+    def test_version_bump_invalidates(self, cache, source, monkeypatch):
+        """Test entries written by an older processor version are ignored."""
+        cache.store(source, self.DOCS)
+        monkeypatch.setattr(cache_module, "CACHE_VERSION", cache_module.CACHE_VERSION + 1)
+
+        assert cache.load(source) is None
+
+    def test_empty_result_not_cached(self, cache, source):
+        """Test a file without documents is retried next time."""
+        cache.store(source, [])
+        assert cache.load(source) is None
+
+    def test_corrupt_entry_ignored(self, cache, source):
+        """Test an unreadable entry counts as a miss."""
+        cache.store(source, self.DOCS)
+        for entry in cache.cache_dir.iterdir():
+            entry.write_bytes(b"{not json")
+
+        assert cache.load(source) is None
@@ -0,0 +1,47 @@
+"""Tests for the prompt cache."""
+
+import asyncio
+import hashlib
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from chatbot.chat.cache import HASH_SIZE, PromptCache, prompt_hash
+from chatbot.history import ChatHistory
+
+
+class TestPromptHash:
+    """Test hashing of prompts."""
+
+    def test_stable_blake2b(self):
+        """Test hashes are plain BLAKE2b, so stored keys stay valid."""
+        expected = hashlib.blake2b(b"systeem\0vraag", digest_size=HASH_SIZE).digest()
+        assert prompt_hash("systeem", "vraag") == expected
+
+    def test_parts_separated(self):
+        """Test moving text between parts changes the hash."""
+        assert prompt_hash("ab", "c") != prompt_hash("a", "bc")
+
+
+class TestPromptCache:
+    """Test the memory and database tiers of the prompt cache."""
+
+    def test_survives_restart(self, tmp_path):
+        """Test an answer is found again by a new cache on the same database."""
+        db_path = tmp_path / "chat_history.db"
+        key = prompt_hash("systeem", "vraag")
+
+        async def run():
+            history = ChatHistory(db_path)
+            await PromptCache(history).set(key, "antwoord")
+            await history.close()
+
+            history = ChatHistory(db_path)
+            cache = PromptCache(history)
+            found = await cache.get(key)
+            missing = await cache.get(prompt_hash("andere vraag"))
+            await history.close()
+            return found, missing
+
+        assert asyncio.run(run()) == ("antwoord", None)
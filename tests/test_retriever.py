@@ -0,0 +1,209 @@
+"""Tests for the retriever."""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+import pytest
+from chatbot.vectorstore.retriever import Retriever
+
+
+class FakeEmbeddingModel:
+    """Embedding model returning the same vector for every text."""
+
+    def embed_query(self, query):
+        return np.array([1.0, 0.5, 0.25])
+
+    def embed_queries(self, queries):
+        return [self.embed_query(query) for query in queries]
+
+
+class FakeVectorStore:
+    """Vector store recording its queries."""
+
+    def __init__(self, metadatas=None):
+        self.embedding_function = SimpleNamespace(embedding_model=FakeEmbeddingModel())
+        self.metadatas = metadatas or []
+        self.queries = []
+        self.metadata_queries = 0
+
+    def query_batch(self, query_embeddings, n_results=5, where=None):
+        self.queries.append((len(query_embeddings), n_results, where))
+        return [
+            [
+                {"id": f"doc{i}", "content": "", "metadata": {}, "score": 0.9 - 0.1 * i}
+                for i in range(n_results)
+            ]
+            for _ in query_embeddings
+        ]
+
+    def get_metadatas(self, where=None):
+        self.metadata_queries += 1
+        return self.metadatas
+
+
+class TestRetrieveBatch:
+    """Test grouping of batched queries."""
+
+    def test_grouped_by_source_types(self):
+        """Test queries sharing a filter are sent to the store together."""
+        store = FakeVectorStore()
+        retriever = Retriever(store)
+
+        results = retriever.retrieve_batch(
+            [
+                ("entiteit AN", ["xsd", "expert"]),
+                ("entiteit PP", ["expert", "xsd"]),
+                ("code 3002", ["codelist"]),
+            ],
+            [2, 4, 3],
+        )
+
+        assert store.queries == [
+            (2, 4, {"source_type": {"$in": ["expert", "xsd"]}}),
+            (1, 3, {"source_type": "codelist"}),
+        ]
+        # Each query is trimmed to its own limit
+        assert [len(r) for r in results] == [2, 4, 3]
+
+    def test_results_in_query_order(self):
+        """Test cached and new results are returned in query order."""
+        store = FakeVectorStore()
+        retriever = Retriever(store)
+        retriever.retrieve("code 1", 1)
+
+        results = retriever.retrieve_batch([("code 2", None), ("code 1", None)], [2, 1])
+
+        assert [len(r) for r in results] == [2, 1]
+        assert len(store.queries) == 2
+
+
+class TestMergeResults:
+    """Test merging of per-query results."""
+
+    def test_deduplicated_with_highest_score(self):
+        """Test a document found twice keeps its highest score."""
+        retriever = Retriever(FakeVectorStore())
+        merged = retriever.merge_results(
+            [
+                [{"id": "a", "score": 0.4}, {"id": "b", "score": 0.7}],
+                [{"id": "a", "score": 0.9}, {"id": "c", "score": 0.5}],
+            ],
+            n_results=10,
+        )
+
+        assert [(doc["id"], doc["score"]) for doc in merged] == [
+            ("a", 0.9),
+            ("b", 0.7),
+            ("c", 0.5),
+        ]
+
+    def test_limited_to_n_results(self):
+        """Test only the best documents are kept."""
+        retriever = Retriever(FakeVectorStore())
+        merged = retriever.merge_results(
+            [[{"id": str(i), "score": i / 10} for i in range(10)]],
+            n_results=3,
+        )
+
+        assert [doc["id"] for doc in merged] == ["9", "8", "7"]
+
+
+class TestRetrieverCache:
+    """Test caching of query results."""
+
+    @pytest.fixture
+    def store(self):
+        """Create a fake vector store."""
+        return FakeVectorStore()
+
+    @pytest.fixture
+    def retriever(self, store):
+        """Create a retriever on the fake store."""
+        return Retriever(store)
+
+    def test_identical_query_cached(self, retriever, store):
+        """Test repeating a query does not query the store again."""
+        first = retriever.retrieve("regel dekking", 3, ["expert"])
+        second = retriever.retrieve("regel dekking", 3, ["expert"])
+
+        assert len(store.queries) == 1
+        assert first == second
+        assert first is not second
+
+    def test_invalidate_drops_results(self, retriever, store):
+        """Test results are not served after invalidate()."""
+        retriever.retrieve("regel dekking", 3, ["expert"])
+        retriever.invalidate()
+        retriever.retrieve("regel dekking", 3, ["expert"])
+
+        assert len(store.queries) == 2
+
+    def test_min_score_filter(self, retriever):
+        """Test results below the minimum score are dropped."""
+        results = retriever.retrieve("regel dekking", 5, min_score=0.65)
+        assert [doc["id"] for doc in results] == ["doc0", "doc1", "doc2"]
+
+
+class TestRuleCodes:
+    """Test the memoized expert rule codes."""
+
+    def test_codes_collected(self):
+        """Test codes are split, stripped and deduplicated."""
+        store = FakeVectorStore([
+            {"related_codes": "E1-002, E2-001"},
+            {"related_codes": "E2-001"},
+            {},
+        ])
+        assert Retriever(store).rule_codes() == {"E1-002", "E2-001"}
+
+    def test_empty_result_memoized(self):
+        """Test a knowledge base without rules is only queried once."""
+        store = FakeVectorStore()
+        retriever = Retriever(store)
+
+        assert retriever.rule_codes() == frozenset()
+        assert retriever.rule_codes() == frozenset()
+        assert store.metadata_queries == 1
+
+        retriever.invalidate()
+        retriever.rule_codes()
+        assert store.metadata_queries == 2
+
+
+class TestNearDuplicateQueries:
+    """Test reuse of results for near-identical queries."""
+
+    @pytest.fixture
+    def store(self):
+        """Create a fake vector store."""
+        return FakeVectorStore()
+
+    @pytest.fixture
+    def retriever(self, store):
+        """Create a retriever on the fake store."""
+        return Retriever(store)
+
+    def test_reworded_query_reused(self, retriever, store):
+        """Test a differently worded query with the same codes reuses results."""
+        retriever.retrieve("wat is code 3002", 3)
+        retriever.retrieve("wat betekent code 3002", 3)
+
+        assert len(store.queries) == 1
+
+    def test_other_code_not_reused(self, retriever, store):
+        """Test a query for another code is never served the first one's results."""
+        retriever.retrieve("code 12", 3)
+        retriever.retrieve("code 13", 3)
+
+        assert len(store.queries) == 2
+
+    def test_other_filter_not_reused(self, retriever, store):
+        """Test results are only reused for the same source types."""
+        retriever.retrieve("wat is code 3002", 3, ["codelist"])
+        retriever.retrieve("wat betekent code 3002", 3, ["xsd"])
+
+        assert len(store.queries) == 2